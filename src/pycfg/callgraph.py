@@ -0,0 +1,407 @@
+"""
+A program-level graph linking the CFGs of a code object and of all the code
+objects nested in it (functions, lambdas, comprehensions, class bodies).
+
+Definition edges (`MAKE_FUNCTION` -> code object) and call edges (call site ->
+callee) are found by scanning bytecode with a symbolic value stack, so neither
+needs a CFG. A name is resolved to a callee only if every store to it in the
+whole program stores a function made from the same code object.
+"""
+
+import dis
+import sys
+from collections import namedtuple
+
+from .cfg import CFG
+
+
+Definition = namedtuple('Definition', 'parent offset code')
+
+CallSite = namedtuple('CallSite', 'caller offset callee')
+
+
+# ops which push a reference to a name, and the ops which store to it
+_name_loads = {'LOAD_FAST', 'LOAD_DEREF', 'LOAD_CLASSDEREF', 'LOAD_GLOBAL',
+               'LOAD_NAME'}
+_name_stores = {'STORE_FAST', 'STORE_DEREF', 'STORE_GLOBAL', 'STORE_NAME'}
+_name_deletes = {'DELETE_FAST', 'DELETE_DEREF', 'DELETE_GLOBAL', 'DELETE_NAME'}
+
+
+# the NULL pushed under (3.11 and 3.12) or over (3.13) a callable by
+# `PUSH_NULL` and `LOAD_GLOBAL`
+_NULL = ('null', None)
+
+
+def _callee_depth(instr, stack):
+    """
+    Returns the position of the callee counted from the top of the stack
+    (the top being 1) for a call instruction, or None if `instr` isn't a call
+    whose callee can be located.
+    """
+
+    opname = instr.opname
+
+    if opname == 'CALL_FUNCTION':
+        return instr.arg + 1
+    elif opname == 'CALL_FUNCTION_KW':
+        return instr.arg + 2
+    elif opname == 'CALL_FUNCTION_EX':
+        # the callee is under a NULL from 3.13 on
+        return 2 + (instr.arg & 1) + (sys.version_info >= (3, 13))
+    elif opname in ('CALL', 'PRECALL'):
+        if sys.version_info >= (3, 13):
+            return instr.arg + 2
+
+        # either NULL and the callee, or a method and self, are under the
+        # arguments
+        if len(stack) >= instr.arg + 2 and stack[-(instr.arg + 2)] == _NULL:
+            return instr.arg + 1
+        return instr.arg + 2
+    elif opname == 'CALL_KW':
+        return instr.arg + 3
+
+    return None
+
+
+class Member:
+    """
+    A code object in a `ProgramGraph`. Its CFG is only built when `cfg` is
+    first accessed.
+    """
+
+    __slots__ = ('code', 'parent', 'children', 'qualname', '_cfg')
+
+    def __init__(self, code, parent=None):
+        self.code = code
+        self.parent = parent
+        self.children = []
+        self._cfg = None
+
+        if parent is None:
+            self.qualname = code.co_name
+        else:
+            self.qualname = parent.qualname + '.' + code.co_name
+
+    @property
+    def cfg(self):
+        if self._cfg is None:
+            self._cfg = CFG(self.code)
+
+        return self._cfg
+
+    @property
+    def has_cfg(self):
+        return self._cfg is not None
+
+    @property
+    def is_module(self):
+        return self.parent is None and self.code.co_name == '<module>'
+
+    def __str__(self):
+        return "Member({})".format(self.qualname)
+
+    __repr__ = __str__
+
+
+class ProgramGraph:
+    def __init__(self, code):
+        self._members = {}
+
+        self.root = self._add(code, None)
+
+        self.__scans = {}
+        self.__bindings = None
+        self.__call_sites = {}
+
+    def _add(self, code, parent):
+        member = Member(code, parent)
+        self._members[id(code)] = member
+
+        for const in code.co_consts:
+            if hasattr(const, 'co_code'):
+                member.children.append(self._add(const, member))
+
+        return member
+
+    def __getitem__(self, code):
+        return self._members[id(code)]
+
+    def __contains__(self, code):
+        return id(code) in self._members
+
+    def __iter__(self):
+        """
+        Iterates over the members in preorder, starting at the root.
+        """
+
+        stack = [self.root]
+
+        while stack:
+            member = stack.pop()
+            yield member
+            stack.extend(reversed(member.children))
+
+    def __len__(self):
+        return len(self._members)
+
+    def cfg(self, code):
+        return self[code].cfg
+
+    def definitions(self, code=None):
+        """
+        Returns the `Definition`s made by `code`, or by every member if `code`
+        is None.
+        """
+
+        if code is None:
+            return [d for member in self for d in self._scan(member)[0]]
+
+        return list(self._scan(self[code])[0])
+
+    def call_sites(self, code):
+        """
+        Returns the `CallSite`s in `code`. The callee of a call site which
+        couldn't be resolved statically is None.
+        """
+
+        member = self[code]
+
+        if id(code) not in self.__call_sites:
+            bindings = self._bindings()
+            sites = []
+
+            for offset, entry in self._scan(member)[1]:
+                sites.append(CallSite(code, offset,
+                                      self._resolve(entry, bindings)))
+
+            self.__call_sites[id(code)] = sites
+
+        return self.__call_sites[id(code)]
+
+    def call_edges(self):
+        """
+        Yields every resolved call site in the program.
+        """
+
+        for member in self:
+            for site in self.call_sites(member.code):
+                if site.callee is not None:
+                    yield site
+
+    def callees(self, code):
+        return [site.callee for site in self.call_sites(code)
+                if site.callee is not None]
+
+    def callers(self, code):
+        return [site for site in self.call_edges() if site.callee is code]
+
+    def _scope_key(self, member, opname, name):
+        """
+        Returns the key identifying the variable which `opname` loads or
+        stores in `member`, or None if the name can't be attributed to a
+        single scope.
+        """
+
+        if opname.endswith('_FAST'):
+            return (id(member.code), 'fast', name)
+
+        elif opname.endswith('DEREF'):
+            owner = member
+
+            while owner is not None and name not in owner.code.co_cellvars:
+                owner = owner.parent
+
+            if owner is None:
+                return None
+
+            return (id(owner.code), 'deref', name)
+
+        elif opname.endswith('_GLOBAL') or member.is_module:
+            return ('global', name)
+
+        elif opname.startswith('STORE') or opname.startswith('DELETE'):
+            return (id(member.code), 'name', name)
+
+        # LOAD_NAME in a class body finds the class namespace first, and then
+        # falls back to the globals
+        return ((id(member.code), 'name', name), ('global', name))
+
+    def _scan(self, member):
+        """
+        Scans the bytecode of `member` once, returning its definitions, its
+        call sites (with the stack entry of the callee) and its stores.
+        """
+
+        if id(member.code) in self.__scans:
+            return self.__scans[id(member.code)]
+
+        definitions = []
+        calls = []
+        stores = []
+
+        stack = []
+        precall = None
+
+        def pop():
+            if stack:
+                return stack.pop()
+            return None
+
+        for instr in dis.get_instructions(member.code):
+            opname = instr.opname
+
+            if instr.is_jump_target:
+                # we don't know what's on the stack if we're coming from
+                # somewhere else
+                stack = []
+
+            depth = _callee_depth(instr, stack)
+            entry = None
+
+            if depth is not None:
+                entry = stack[-depth] if len(stack) >= depth else None
+
+            if opname == 'PRECALL':
+                # 3.11 pops the arguments at PRECALL, so the callee of the
+                # following CALL is found here
+                precall = entry
+            elif opname == 'CALL' and sys.version_info < (3, 12):
+                calls.append((instr.offset, precall))
+            elif depth is not None:
+                calls.append((instr.offset, entry))
+
+            if opname == 'LOAD_CONST':
+                if hasattr(instr.argval, 'co_code'):
+                    stack.append(('code', instr.argval))
+                else:
+                    stack.append(None)
+
+            elif opname in _name_loads:
+                key = self._scope_key(member, opname, instr.argval)
+                ref = None if key is None else ('ref', key)
+
+                if (opname == 'LOAD_GLOBAL' and sys.version_info >= (3, 11)
+                        and instr.arg & 1):
+                    if sys.version_info >= (3, 13):
+                        stack.extend([ref, _NULL])
+                    else:
+                        stack.extend([_NULL, ref])
+                else:
+                    stack.append(ref)
+
+            elif opname == 'PUSH_NULL':
+                stack.append(_NULL)
+
+            elif opname in _name_stores:
+                key = self._scope_key(member, opname, instr.argval)
+                entry = pop()
+                code = entry[1] if entry and entry[0] == 'code' else None
+                stores.append((key, code))
+
+            elif opname in _name_deletes:
+                key = self._scope_key(member, opname, instr.argval)
+                stores.append((key, None))
+
+            elif opname == 'MAKE_FUNCTION':
+                if sys.version_info < (3, 11):
+                    pop()   # qualified name
+
+                entry = pop()
+
+                # the flags say which extra values (defaults, closure...) are
+                # on the stack; newer versions set them with separate ops
+                for _ in range(bin((instr.arg or 0) & 0xf).count('1')):
+                    pop()
+
+                if entry is not None and entry[0] == 'code':
+                    definitions.append(Definition(member.code, instr.offset,
+                                                  entry[1]))
+                    stack.append(entry)
+                else:
+                    stack.append(None)
+
+            elif opname == 'SET_FUNCTION_ATTRIBUTE':
+                # 3.13 sets defaults, closures... on the function on top of
+                # the stack
+                entry = pop()
+                pop()
+                stack.append(entry)
+
+            elif opname == 'POP_TOP':
+                pop()
+
+            elif opname == 'DUP_TOP':
+                stack.append(stack[-1] if stack else None)
+
+            elif opname == 'ROT_TWO' and len(stack) >= 2:
+                stack[-1], stack[-2] = stack[-2], stack[-1]
+
+            else:
+                try:
+                    if instr.arg is None:
+                        effect = dis.stack_effect(instr.opcode)
+                    else:
+                        effect = dis.stack_effect(instr.opcode, instr.arg)
+                except ValueError:
+                    stack = []
+                    continue
+
+                # We don't know how many values the instruction pops, so we
+                # assume it consumed the top of the stack and produced
+                # something we know nothing about.
+                for _ in range(-effect):
+                    pop()
+
+                if stack:
+                    stack[-1] = None
+
+                stack.extend([None] * effect)
+
+        scan = (definitions, calls, stores)
+        self.__scans[id(member.code)] = scan
+
+        return scan
+
+    def _bindings(self):
+        """
+        Maps every variable to the code object of the function stored in it,
+        or to None if it may hold anything else.
+        """
+
+        if self.__bindings is None:
+            bindings = {}
+
+            for member in self:
+                for key, code in self._scan(member)[2]:
+                    if key is None:
+                        continue
+
+                    if key in bindings and bindings[key] is not code:
+                        bindings[key] = None
+                    else:
+                        bindings[key] = code
+
+            self.__bindings = bindings
+
+        return self.__bindings
+
+    def _resolve(self, entry, bindings):
+        if entry is None:
+            return None
+
+        kind, value = entry
+
+        if kind == 'code':
+            return value
+
+        if kind == 'null':
+            return None
+
+        if isinstance(value[0], tuple):
+            # a LOAD_NAME which may resolve in one of several scopes
+            for key in value:
+                if key in bindings:
+                    return bindings[key]
+            return None
+
+        return bindings.get(value)
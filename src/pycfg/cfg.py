@@ -1,4 +1,6 @@
 import dis
+import sys
+from array import array
 from collections import namedtuple, deque
 from functools import lru_cache
 from queue import Queue
@@ -6,6 +8,31 @@ from queue import Queue
 from . import ops
 
 
+# CPython 3.11 replaced the SETUP_* instructions with exception tables
+USE_EXCEPTION_TABLE = sys.version_info >= (3, 11)
+
+
+def synthetic_instruction(opname, offset, opcode=0, arg=0):
+    """
+    Returns an instruction for a node which isn't in the bytecode, such as the
+    exit node. Fields which only some versions of `dis.Instruction` have are
+    left as None.
+    """
+
+    fields = {
+        'opname': opname,
+        'opcode': opcode,
+        'arg': arg,
+        'argval': '',
+        'argrepr': '',
+        'offset': offset,
+        'starts_line': 0,
+        'is_jump_target': False,
+    }
+
+    return dis.Instruction(*(fields.get(f) for f in dis.Instruction._fields))
+
+
 class InvalidInstruction(Exception):
     pass
 
@@ -25,20 +52,36 @@ class CircularDependenciesException(Exception):
 class CFG:
     def __init__(self, code):
 
-        self.__edge_num = {}
+        self._setup(code, BlockStack())
 
-        bytecode = dis.Bytecode(code)
         self.basic_blocks = {
-            -1: BasicBlock(dis.Instruction('FUNCTION_EXIT', 0, 0, '', '', -1, 0, False))
+            -1: BasicBlock(synthetic_instruction('FUNCTION_EXIT', -1))
         }
 
-        self._blockstack = BlockStack()
+        if USE_EXCEPTION_TABLE:
+            from .exceptiontable import build_basic_blocks
+            build_basic_blocks(self, code)
+        else:
+            self._build(dis.Bytecode(code), {0}, set())
 
-        # maintains the list of reachable instructions
-        reachable_instructions = {0}
+    def _build(self, instructions, reachable_instructions,
+               unreachable_jump_targets):
+        """
+        Adds a basic block for every reachable instruction in `instructions`,
+        which must come after all the basic blocks already in the CFG.
 
-        # the targets of unreachable jump instructions
-        unreachable_jump_targets = set()
+        `reachable_instructions` are the offsets known to be reachable, and
+        `unreachable_jump_targets` are the targets of the unreachable jump
+        instructions seen so far.
+        """
+
+        # maps offsets to the basic blocks which have them as successors, in
+        # the order in which the basic blocks were added
+        predecessors = {}
+
+        for bb in self.basic_blocks.values():
+            for succ in set(bb.successors):
+                predecessors.setdefault(succ, []).append(bb)
 
         def is_reachable(instr):
             if instr.offset in reachable_instructions:
@@ -49,9 +92,7 @@ class CFG:
                 return True
 
         def predecessors_of(current_bb):
-            for bb in self.basic_blocks.values():
-                if current_bb.offset in bb.successors:
-                    yield bb
+            return predecessors.get(current_bb.offset, [])
 
         def join_blockstack_views(current_bb):
             blocks = set()
@@ -90,7 +131,7 @@ class CFG:
 
             return metadata
 
-        for instr in bytecode:
+        for instr in instructions:
 
             if not is_reachable(instr):
                 if instr.opname in ops.jumps:
@@ -113,10 +154,152 @@ class CFG:
 
             reachable_instructions.update(set(successors))
 
+            for succ in set(successors):
+                predecessors.setdefault(succ, []).append(bb)
+
             bb.successors = successors
             bb.blockstack_view = blockstack_view
             bb.path_metadata = new_metadata
 
+    def rebuild(self, code):
+        """
+        Updates the CFG in place for `code`, a new version of the code object
+        it was built from, and returns the offset from which basic blocks were
+        recomputed.
+
+        A basic block only depends on the instructions before it (and on
+        which instructions are jump targets), so the basic blocks before the
+        first change are kept as they are, along with their block stack views
+        and path metadata, and only their instructions are refreshed.
+
+        For CFGs built from exception tables, a basic block only depends on
+        its instruction, on the offset of the next one and on its handler, so
+        the basic blocks after the change are kept too, moved by the change in
+        the length of the code, unless a jump or handler goes back across the
+        change. Only the successors of the changed instructions are
+        recomputed, but the new code is still decoded in full, since
+        instructions hold absolute offsets and line numbers, and decoding is
+        most of the cost of a rebuild.
+        """
+
+        if USE_EXCEPTION_TABLE:
+            return self._rebuild_from_exception_table(code)
+
+        old_bytes = self.code.co_code
+        new_bytes = code.co_code
+
+        changed = min(len(old_bytes), len(new_bytes))
+        for i in range(changed):
+            if old_bytes[i] != new_bytes[i]:
+                changed = i
+                break
+
+        # an instruction which becomes (or stops being) a jump target may
+        # become reachable (or unreachable)
+        labels = set(dis.findlabels(old_bytes)) ^ set(dis.findlabels(new_bytes))
+        changed = min([changed] + list(labels))
+        changed -= changed % 2
+
+        kept = {offset: bb for offset, bb in self.basic_blocks.items()
+                if offset < changed}
+
+        instructions = []
+        reachable_instructions = {0}
+        unreachable_jump_targets = set()
+
+        for instr in dis.get_instructions(code):
+            if instr.offset >= changed:
+                instructions.append(instr)
+            elif instr.offset in kept:
+                kept[instr.offset].instruction = instr
+            elif instr.opname in ops.jumps:
+                unreachable_jump_targets.add(instr.argval)
+
+        for bb in kept.values():
+            reachable_instructions.update(bb.successors)
+
+        # every SETUP_* instruction pushed one block, in order of offsets
+        pushed = sum(1 for bb in kept.values()
+                     if bb.instruction.opname in ops.block_setups)
+        del self._blockstack.blocks[pushed:]
+
+        self._setup(code, self._blockstack)
+        self.basic_blocks = kept
+        self._build(instructions, reachable_instructions,
+                    unreachable_jump_targets)
+
+        return changed
+
+    def _rebuild_from_exception_table(self, code):
+        from .exceptiontable import (ExceptionTable, build_basic_blocks,
+                                     reusable_blocks)
+
+        instructions = list(dis.get_instructions(code))
+        table = ExceptionTable(code)
+        kept, changed, _ = reusable_blocks(self, code, instructions, table)
+
+        self._setup(code, self._blockstack)
+        self.basic_blocks = {-1: self.basic_blocks[-1]}
+        build_basic_blocks(self, code, kept, instructions, table)
+
+        return changed
+
+    def _setup(self, code, blockstack):
+        self.code = code
+        self._blockstack = blockstack
+
+        self.__edge_num = {}
+        self.__dense_index = None
+        self.__loop_forest = None
+        self.__reachability = None
+
+    @classmethod
+    def from_basic_blocks(cls, code, basic_blocks, blockstack=None):
+        """
+        Creates a CFG from basic blocks which were already computed, e.g. by a
+        transform of another CFG.
+        """
+
+        cfg = cls.__new__(cls)
+        cfg._setup(code, blockstack or BlockStack())
+        cfg.basic_blocks = basic_blocks
+
+        return cfg
+
+    def dense_index(self):
+        """
+        Returns a `DenseIndex` of this CFG, which is built on first use.
+        """
+
+        if self.__dense_index is None:
+            self.__dense_index = DenseIndex(self.basic_blocks)
+
+        return self.__dense_index
+
+    def loop_forest(self):
+        """
+        Returns the `pycfg.loops.LoopForest` of this CFG, which is built on
+        first use.
+        """
+
+        if self.__loop_forest is None:
+            from .loops import LoopForest
+            self.__loop_forest = LoopForest(self)
+
+        return self.__loop_forest
+
+    def reachability(self):
+        """
+        Returns the `pycfg.reachability.ReachabilityIndex` of this CFG, which
+        is built on first use.
+        """
+
+        if self.__reachability is None:
+            from .reachability import ReachabilityIndex
+            self.__reachability = ReachabilityIndex(self)
+
+        return self.__reachability
+
     def to_dot(self):
         dot = "digraph cfg { node [shape=record]; "
 
@@ -160,9 +343,17 @@ class CFG:
         return self.__edge_num[edge]
 
     def is_critical(self, edge):
-        preds = self.filter(predecessors_of=edge[1])
+        """
+        Returns whether the end of `edge` has more than one predecessor.
+        """
+
+        index = self.dense_index()
+        end = index.positions.get(edge[1])
 
-        return len(list(preds)) > 1
+        if end is None:
+            return False
+
+        return index.pred_start[end+1] - index.pred_start[end] > 1
 
     def filter(self, **constraints):
         if constraints.pop('traverse', False):
@@ -246,6 +437,177 @@ class CFG:
         return key in self.basic_blocks
 
 
+class DenseIndex:
+    """
+    Numbers the basic blocks of a CFG densely, in order of their offsets, and
+    stores the edges as compressed arrays of successors and predecessors.
+
+    The successors of node `i` are `succ[succ_start[i]:succ_start[i+1]]`, and
+    the position of an edge in `succ` is its edge id.
+    """
+
+    __slots__ = ('offsets', 'positions', 'succ_start', 'succ', 'pred_start',
+                 'pred')
+
+    def __init__(self, basic_blocks):
+        self.offsets = array('i', sorted(basic_blocks))
+        self.positions = {offset: i for i, offset in enumerate(self.offsets)}
+
+        n = len(self.offsets)
+
+        self.succ_start = array('I', [0])
+        self.succ = array('I')
+        in_degree = [0] * n
+
+        for offset in self.offsets:
+            seen = set()
+
+            for succ in basic_blocks[offset].successors:
+                j = self.positions.get(succ)
+
+                if j is None or j in seen:
+                    continue
+
+                seen.add(j)
+                self.succ.append(j)
+                in_degree[j] += 1
+
+            self.succ_start.append(len(self.succ))
+
+        self.pred_start = array('I', [0] * (n + 1))
+        for j in range(n):
+            self.pred_start[j+1] = self.pred_start[j] + in_degree[j]
+
+        self.pred = array('I', [0] * len(self.succ))
+        fill = array('I', self.pred_start[:n])
+
+        for i in range(n):
+            for e in range(self.succ_start[i], self.succ_start[i+1]):
+                j = self.succ[e]
+                self.pred[fill[j]] = i
+                fill[j] += 1
+
+    @classmethod
+    def from_arrays(cls, offsets, succ_start, succ, pred_start, pred):
+        """
+        Creates an index from arrays which were already computed (e.g. ones
+        which were loaded from a file).
+        """
+
+        index = cls.__new__(cls)
+        index.offsets = offsets
+        index.positions = {offset: i for i, offset in enumerate(offsets)}
+        index.succ_start = succ_start
+        index.succ = succ
+        index.pred_start = pred_start
+        index.pred = pred
+
+        return index
+
+    def __len__(self):
+        return len(self.offsets)
+
+    @property
+    def num_edges(self):
+        return len(self.succ)
+
+    def successors(self, i):
+        return self.succ[self.succ_start[i]:self.succ_start[i+1]]
+
+    def predecessors(self, i):
+        return self.pred[self.pred_start[i]:self.pred_start[i+1]]
+
+    def edge_id(self, edge):
+        """
+        Returns the position of the edge `(start, end)` (given as offsets) in
+        `succ`, or raises a `KeyError` if there's no such edge.
+        """
+
+        start, end = edge
+        i = self.positions[start]
+        j = self.positions[end]
+
+        for e in range(self.succ_start[i], self.succ_start[i+1]):
+            if self.succ[e] == j:
+                return e
+
+        raise KeyError(edge)
+
+    def edges(self):
+        """
+        Yields all the edges as `(start, end)` offset pairs, in edge id order.
+        """
+
+        for i, offset in enumerate(self.offsets):
+            for e in range(self.succ_start[i], self.succ_start[i+1]):
+                yield offset, self.offsets[self.succ[e]]
+
+    def reverse_postorder(self, root=None):
+        """
+        Returns the indices of the nodes reachable from `root` (the node at
+        offset 0 by default) in reverse postorder.
+        """
+
+        if root is None:
+            root = self.positions[0]
+
+        order = []
+        visited = bytearray(len(self.offsets))
+        visited[root] = 1
+        stack = [(root, self.succ_start[root])]
+
+        while stack:
+            i, e = stack[-1]
+
+            if e < self.succ_start[i+1]:
+                stack[-1] = (i, e + 1)
+                j = self.succ[e]
+
+                if not visited[j]:
+                    visited[j] = 1
+                    stack.append((j, self.succ_start[j]))
+            else:
+                stack.pop()
+                order.append(i)
+
+        order.reverse()
+        return order
+
+    def retreating_edges(self, root=None):
+        """
+        Returns the ids of the edges which close a cycle in a depth-first
+        search from `root` (the node at offset 0 by default). Removing them
+        leaves the graph acyclic.
+        """
+
+        if root is None:
+            root = self.positions[0]
+
+        retreating = set()
+        on_stack = bytearray(len(self.offsets))
+        visited = bytearray(len(self.offsets))
+        visited[root] = on_stack[root] = 1
+        stack = [(root, self.succ_start[root])]
+
+        while stack:
+            i, e = stack[-1]
+
+            if e < self.succ_start[i+1]:
+                stack[-1] = (i, e + 1)
+                j = self.succ[e]
+
+                if on_stack[j]:
+                    retreating.add(e)
+                elif not visited[j]:
+                    visited[j] = on_stack[j] = 1
+                    stack.append((j, self.succ_start[j]))
+            else:
+                stack.pop()
+                on_stack[i] = 0
+
+        return retreating
+
+
 class BlockStackView:
     __slots__ = ('blockstack', 'last_block')
 
@@ -467,8 +829,7 @@ def compute_jump_targets(instr, path_metadata, blockstack_view):
 
         path_metadata['has return'] = True
 
-    elif opname in {'SETUP_FINALLY', 'SETUP_EXCEPT', 'SETUP_LOOP',
-                    'SETUP_WITH'}:
+    elif opname in ops.block_setups:
         targets = [next_offset]
 
         block_end = instr.argval
@@ -0,0 +1,343 @@
+"""
+Memory-mapped files of edge or path counters, which processes can increment
+in place and which can be merged cheaply.
+
+A file has a fixed header followed by an array of uint64 counters in native
+byte order, aligned to 8 bytes. The counters are indexed by the edge ids of
+the CFG's `DenseIndex`, or by the Ball-Larus path ids of the CFG (see
+`hotpaths.BallLarus`). The header records the structural fingerprint of the
+code object (see `fingerprint.py`) and a hash of the CFG's edge layout, so
+counts are never merged or read against a CFG with different ids. A file
+holds at most `MAX_COUNTERS` counters, which bounds the Ball-Larus paths of
+the CFGs whose paths can be counted.
+
+Increments aren't atomic, so every process should write its own file and
+the files should be merged afterwards:
+
+    python -m pycfg.counters merged.cnt worker-*.cnt
+"""
+
+import argparse
+import hashlib
+import mmap
+import struct
+import sys
+from array import array
+
+from .fingerprint import fingerprint
+
+
+MAGIC = b'PCNT'
+VERSION = 1
+
+BYTE_ORDER_MARK = 0x0001
+
+EDGE = 0
+PATH = 1
+
+_kinds = {'edge': EDGE, 'path': PATH}
+
+# 128 MiB of counters
+MAX_COUNTERS = 1 << 24
+
+# magic, version, byte order mark, kind, fingerprint, layout, count
+_header = struct.Struct('=4sHHI16s16sQ')
+
+
+class InvalidCounterFile(Exception):
+    pass
+
+
+def _align(n):
+    return (n + 7) & ~7
+
+
+def layout_hash(cfg):
+    """
+    Returns a hash of the node offsets and edges of `cfg`, which determine
+    its edge and path ids.
+    """
+
+    index = cfg.dense_index()
+
+    h = hashlib.blake2b(digest_size=16)
+    for column in (index.offsets, index.succ_start, index.succ):
+        h.update(memoryview(column).tobytes())
+
+    return h.digest()
+
+
+def _fingerprint(cfg):
+    # a `MappedCFG` has no code object, but stores its fingerprint
+    fp = getattr(cfg, 'fingerprint', None)
+    return fp if fp is not None else fingerprint(cfg.code)
+
+
+def _num_counters(cfg, kind):
+    if kind == EDGE:
+        return cfg.dense_index().num_edges
+
+    from .hotpaths import BallLarus
+    return BallLarus(cfg).num_paths
+
+
+class CounterFile:
+    """
+    A file of counters mapped into memory. Use `create` or `open` rather than
+    the constructor.
+    """
+
+    def __init__(self, f, mapped, writable):
+        self._file = f
+        self._mmap = mapped
+        self.writable = writable
+
+        if len(mapped) < _header.size:
+            raise InvalidCounterFile("File is too short to be a counter file")
+
+        magic, version, mark, kind, fp, layout, count = \
+            _header.unpack_from(mapped, 0)
+
+        if magic != MAGIC:
+            raise InvalidCounterFile("Not a counter file")
+        if version != VERSION:
+            raise InvalidCounterFile("Unsupported counter file version: %d" % version)
+        if mark != BYTE_ORDER_MARK:
+            raise InvalidCounterFile("Counter file was written with another byte order")
+        if kind not in (EDGE, PATH):
+            raise InvalidCounterFile("Unknown kind of counters: %d" % kind)
+        if count > MAX_COUNTERS:
+            raise InvalidCounterFile("Counter file has too many counters: %d" % count)
+
+        position = _align(_header.size)
+
+        if position + 8 * count > len(mapped):
+            raise InvalidCounterFile("Counter file is truncated")
+
+        self.kind = kind
+        self.fingerprint = fp
+        self.layout = layout
+
+        # read-only mappings give read-only views
+        self._view = view = memoryview(mapped)
+        self.counts = view[position:position + 8 * count].cast('Q')
+
+    @classmethod
+    def create(cls, path, cfg, kind='edge'):
+        """
+        Creates a file at `path` (replacing any existing one) with a zeroed
+        counter for every edge of `cfg`, or for every Ball-Larus path if
+        `kind` is 'path', and maps it for writing.
+
+        Raises ValueError if the CFG needs more than `MAX_COUNTERS` counters.
+        """
+
+        if kind not in _kinds:
+            raise ValueError("kind must be 'edge' or 'path'")
+
+        kind = _kinds[kind]
+        count = _num_counters(cfg, kind)
+
+        if count > MAX_COUNTERS:
+            raise ValueError("CFG needs {} counters, more than the maximum of {}"
+                             .format(count, MAX_COUNTERS))
+
+        header = _header.pack(MAGIC, VERSION, BYTE_ORDER_MARK, kind,
+                              _fingerprint(cfg), layout_hash(cfg), count)
+
+        f = open(path, 'w+b')
+        f.write(header)
+        f.truncate(_align(_header.size) + 8 * count)
+        f.flush()
+
+        return cls(f, mmap.mmap(f.fileno(), 0), True)
+
+    @classmethod
+    def open(cls, path, writable=False):
+        f = open(path, 'r+b' if writable else 'rb')
+        access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=access)
+            return cls(f, mapped, writable)
+        except (InvalidCounterFile, ValueError):
+            f.close()
+            raise
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __getitem__(self, i):
+        return self.counts[i]
+
+    def increment(self, i, n=1):
+        """
+        Adds `n` to counter `i`, in place.
+        """
+
+        self.counts[i] += n
+
+    def matches(self, cfg):
+        """
+        Returns whether the counters of this file are ids of `cfg`.
+        """
+
+        return (self.layout == layout_hash(cfg) and
+                self.fingerprint == _fingerprint(cfg))
+
+    def validate(self, cfg):
+        if not self.matches(cfg):
+            raise InvalidCounterFile("Counters don't match the layout of the CFG")
+
+        if len(self) != _num_counters(cfg, self.kind):
+            raise InvalidCounterFile("Wrong number of counters for the CFG")
+
+    def edge_counts(self, cfg):
+        """
+        Returns the counts keyed by `(start, end)` offsets, after checking
+        that they were counted for `cfg`.
+        """
+
+        if self.kind != EDGE:
+            raise InvalidCounterFile("File doesn't hold edge counters")
+
+        self.validate(cfg)
+        return dict(zip(cfg.dense_index().edges(), self.counts))
+
+    def path_counts(self, cfg):
+        """
+        Returns the non-zero counts keyed by Ball-Larus path id, after
+        checking that they were counted for `cfg`.
+        """
+
+        if self.kind != PATH:
+            raise InvalidCounterFile("File doesn't hold path counters")
+
+        self.validate(cfg)
+        return {i: count for i, count in enumerate(self.counts) if count}
+
+    def flush(self):
+        self._mmap.flush()
+
+    def close(self):
+        self.counts.release()
+        self._view.release()
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# the bytes of a uint64 in a 128-bit lane of the same byte order
+_low = 0 if sys.byteorder == 'little' else 8
+_high = 8 - _low
+
+
+def _widen(counts):
+    """
+    Returns the uint64s of `counts` as one int, with every counter in a
+    128-bit lane, so adding two of these ints adds the counters without
+    carrying into the next one.
+    """
+
+    data = counts.tobytes()
+    wide = bytearray(2 * len(data))
+
+    for b in range(8):
+        wide[_low + b::16] = data[b::8]
+
+    return int.from_bytes(wide, sys.byteorder)
+
+
+def _narrow(total, count):
+    """
+    Returns the counters of the lanes of `total` as an `array('Q')`. Raises
+    OverflowError if one of them doesn't fit in 64 bits.
+    """
+
+    wide = total.to_bytes(16 * count, sys.byteorder)
+    low = bytearray(8 * count)
+    high = bytearray(8 * count)
+
+    for b in range(8):
+        low[b::8] = wide[_low + b::16]
+        high[b::8] = wide[_high + b::16]
+
+    if high.count(0) != len(high):
+        i = (len(high) - len(high.lstrip(b'\0'))) // 8
+        raise OverflowError("Sum of counter {} doesn't fit in 64 bits".format(i))
+
+    total = array('Q')
+    total.frombytes(low)
+    return total
+
+
+def merge(paths, output=None, cfg=None):
+    """
+    Sums the counters of the files at `paths`, which must all have been
+    created for the same CFG (and for `cfg`, if it's given).
+
+    Returns the sums as an `array('Q')`, and also writes them to a new counter
+    file at `output` if it's given. Raises OverflowError if a sum doesn't fit
+    in a counter.
+    """
+
+    if not paths:
+        raise ValueError("No counter files to merge")
+
+    header = None
+    total = None
+
+    for path in paths:
+        with CounterFile.open(path) as counters:
+            file_header = (counters.kind, counters.fingerprint,
+                           counters.layout, len(counters))
+
+            if header is None:
+                header = file_header
+
+                if cfg is not None:
+                    counters.validate(cfg)
+
+                total = _widen(counters.counts)
+            elif file_header != header:
+                raise InvalidCounterFile(
+                    "{} wasn't counted for the same CFG as {}".format(path, paths[0]))
+            else:
+                # one addition of big ints per file, rather than one per
+                # counter
+                total += _widen(counters.counts)
+
+    kind, fp, layout, count = header
+    total = _narrow(total, count)
+
+    if output is not None:
+        with open(output, 'wb') as f:
+            f.write(_header.pack(MAGIC, VERSION, BYTE_ORDER_MARK, kind, fp,
+                                 layout, count))
+            f.write(bytes(_align(_header.size) - _header.size))
+            f.write(total.tobytes())
+
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m pycfg.counters',
+        description="Sum counter files written for the same CFG.")
+    parser.add_argument('output', help="path of the merged counter file")
+    parser.add_argument('inputs', nargs='+', help="counter files to merge")
+    args = parser.parse_args(argv)
+
+    try:
+        merge(args.inputs, args.output)
+    except (InvalidCounterFile, OverflowError) as e:
+        parser.exit(1, "error: {}\n".format(e))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,285 @@
+"""
+Bit-vector dataflow analyses over a CFG.
+
+An analysis gives every node of the CFG's `DenseIndex` a `gen` and a `kill`
+set, packed into ints, and the solver finds the fixed point of
+
+    out = gen | (in & ~kill)
+
+where `in` is the union (or, for must-analyses, the intersection) of the
+`out` sets of the node's predecessors, or of its successors for backward
+analyses. Nodes are taken from the worklist in reverse postorder (postorder
+for backward analyses), so most CFGs converge in two or three passes.
+"""
+
+import heapq
+from collections import namedtuple
+
+from . import ops
+
+
+Definition = namedtuple('Definition', 'offset name')
+
+
+def local_accesses(instr):
+    """
+    Returns the accesses of `instr` to local variables, in the order in which
+    they happen, as a list of `(kind, var)` pairs where `kind` is 'load',
+    'store' or 'delete', and `var` is the variable's number in `co_varnames`.
+
+    Deleting a local also reads it, since it fails if the local is unbound.
+    """
+
+    opname = instr.opname
+
+    if opname in ops.local_pairs:
+        first, second = ops.local_pairs[opname]
+        return [(first, instr.arg >> 4), (second, instr.arg & 15)]
+
+    accesses = []
+
+    if opname in ops.local_loads or opname in ops.local_deletes:
+        accesses.append(('load', instr.arg))
+
+    if opname in ops.local_stores:
+        accesses.append(('store', instr.arg))
+
+    if opname in ops.local_deletes:
+        accesses.append(('delete', instr.arg))
+
+    return accesses
+
+
+def solve(index, gen, kill, forward=True, may=True, boundary=0, universe=0):
+    """
+    Solves a bit-vector problem over a `DenseIndex`, where `gen[i]` and
+    `kill[i]` are the sets of node `i`.
+
+    `boundary` flows into the node at offset 0 for forward problems, and into
+    the exit node for backward ones. Must-problems (`may=False`) start every
+    other set at `universe`, the set of all the bits.
+
+    Returns `(before, after)`, the sets holding right before and right after
+    every node is executed.
+    """
+
+    n = len(index)
+
+    if forward:
+        root = index.positions[0]
+        inputs, outputs = index.predecessors, index.successors
+    else:
+        root = index.positions[-1]
+        inputs, outputs = index.successors, index.predecessors
+
+    order = index.reverse_postorder()
+
+    # nodes which can't be reached from the entry (e.g. the exit of a
+    # function which never returns) still get a value
+    seen = bytearray(n)
+    for i in order:
+        seen[i] = 1
+    order.extend(i for i in range(n) if not seen[i])
+
+    if not forward:
+        order.reverse()
+
+    priority = [0] * n
+    for p, i in enumerate(order):
+        priority[i] = p
+
+    top = 0 if may else universe
+    flow_in = [top] * n
+    flow_out = [top] * n
+
+    worklist = list(range(n))
+    queued = bytearray([1]) * n
+
+    while worklist:
+        i = order[heapq.heappop(worklist)]
+        queued[i] = 0
+
+        value = top
+        if may:
+            for j in inputs(i):
+                value |= flow_out[j]
+        else:
+            for j in inputs(i):
+                value &= flow_out[j]
+
+        if i == root:
+            value = value | boundary if may else value & boundary
+
+        flow_in[i] = value
+        value = gen[i] | (value & ~kill[i])
+
+        if value != flow_out[i]:
+            flow_out[i] = value
+
+            for j in outputs(i):
+                if not queued[j]:
+                    queued[j] = 1
+                    heapq.heappush(worklist, priority[j])
+
+    if forward:
+        return flow_in, flow_out
+
+    return flow_out, flow_in
+
+
+def _bits(value):
+    while value:
+        low = value & -value
+        yield low.bit_length() - 1
+        value ^= low
+
+
+class Liveness:
+    """
+    The local variables which are live (may be read before they're stored to
+    again) before and after every node of `cfg`.
+
+    Only `*_FAST` locals are tracked; cell variables and reads through
+    `locals()` or frame objects aren't visible in the bytecode.
+    """
+
+    def __init__(self, cfg):
+        self.cfg = cfg
+        self.index = index = cfg.dense_index()
+
+        gen = [0] * len(index)
+        kill = [0] * len(index)
+
+        for i, offset in enumerate(index.offsets):
+            # accesses are applied backwards, since the set flows backwards
+            for kind, var in reversed(local_accesses(cfg[offset].instruction)):
+                bit = 1 << var
+
+                if kind == 'load':
+                    gen[i] |= bit
+                    kill[i] &= ~bit
+                else:
+                    kill[i] |= bit
+                    gen[i] &= ~bit
+
+        self.before, self.after = solve(index, gen, kill, forward=False)
+
+    def _names(self, value):
+        varnames = self.cfg.code.co_varnames
+        return frozenset(varnames[var] for var in _bits(value))
+
+    def live_before(self, offset):
+        return self._names(self.before[self.index.positions[offset]])
+
+    def live_after(self, offset):
+        return self._names(self.after[self.index.positions[offset]])
+
+    def is_live_after(self, offset, name):
+        var = self.cfg.code.co_varnames.index(name)
+        return bool(self.after[self.index.positions[offset]] >> var & 1)
+
+
+def dead_stores(cfg, liveness=None):
+    """
+    Returns the offsets of the instructions which store a local variable
+    which is never read afterwards, in order.
+    """
+
+    if liveness is None:
+        liveness = Liveness(cfg)
+
+    index = liveness.index
+    dead = []
+
+    for i, offset in enumerate(index.offsets):
+        accesses = local_accesses(cfg[offset].instruction)
+        live = liveness.after[i]
+
+        for kind, var in reversed(accesses):
+            if kind == 'store' and not live >> var & 1:
+                dead.append(offset)
+                break
+
+            if kind == 'load':
+                live |= 1 << var
+            else:
+                live &= ~(1 << var)
+
+    return dead
+
+
+class ReachingDefinitions:
+    """
+    The definitions of local variables which may reach every node of `cfg`.
+
+    Every store or delete of a local is a definition, and so is every
+    argument, which is defined on entry with an offset of None.
+    """
+
+    def __init__(self, cfg):
+        self.cfg = cfg
+        self.index = index = cfg.dense_index()
+
+        code = cfg.code
+        num_args = code.co_argcount + code.co_kwonlyargcount
+        num_args += bool(code.co_flags & 0x04) + bool(code.co_flags & 0x08)
+
+        self.definitions = [Definition(None, name)
+                            for name in code.co_varnames[:num_args]]
+
+        # the definitions made by every node, as (var, definition number)
+        made = [[] for _ in range(len(index))]
+        defs_of_var = {var: 1 << var for var in range(num_args)}
+
+        for i, offset in enumerate(index.offsets):
+            for kind, var in local_accesses(cfg[offset].instruction):
+                if kind == 'load':
+                    continue
+
+                d = len(self.definitions)
+                self.definitions.append(Definition(offset,
+                                                   code.co_varnames[var]))
+                made[i].append((var, d))
+                defs_of_var[var] = defs_of_var.get(var, 0) | 1 << d
+
+        gen = [0] * len(index)
+        kill = [0] * len(index)
+
+        for i, defs in enumerate(made):
+            for var, d in defs:
+                kill[i] |= defs_of_var[var]
+                gen[i] = (gen[i] & ~defs_of_var[var]) | 1 << d
+
+        self._made = made
+        self._defs_of_var = defs_of_var
+        self.before, self.after = solve(index, gen, kill,
+                                        boundary=(1 << num_args) - 1)
+
+    def reaching(self, offset):
+        """
+        Returns the `Definition`s which may reach the node at `offset`.
+        """
+
+        value = self.before[self.index.positions[offset]]
+        return [self.definitions[d] for d in _bits(value)]
+
+    def definitions_of(self, offset):
+        """
+        Returns the `Definition`s which may reach the loads of the node at
+        `offset` (its use-def chain).
+        """
+
+        i = self.index.positions[offset]
+        value = self.before[i]
+        made = iter(self._made[i])
+        result = []
+
+        for kind, var in local_accesses(self.cfg[offset].instruction):
+            if kind == 'load':
+                defs = value & self._defs_of_var.get(var, 0)
+                result.extend(self.definitions[d] for d in _bits(defs))
+            else:
+                _, d = next(made)
+                value = (value & ~self._defs_of_var[var]) | 1 << d
+
+        return result
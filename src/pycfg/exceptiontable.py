@@ -0,0 +1,281 @@
+"""
+CFG construction for interpreters which store exception handlers in
+`co_exceptiontable` (CPython 3.11 and later) instead of pushing blocks with
+`SETUP_*` instructions.
+
+The handler of an instruction is found by binary search in the sorted,
+non-overlapping ranges of the exception table, so no block stack has to be
+simulated. Every instruction in a protected range which can raise gets an
+edge to its handler, and an exception raised outside of any range leaves
+the function.
+"""
+
+import dis
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+
+from . import ops
+
+
+ExceptionTableEntry = namedtuple('ExceptionTableEntry', 'start end target depth lasti')
+
+
+def _parse_varint(data, position):
+    b = data[position]
+    value = b & 63
+    position += 1
+
+    while b & 64:
+        b = data[position]
+        value = (value << 6) | (b & 63)
+        position += 1
+
+    return value, position
+
+
+def parse_exception_table(code):
+    """
+    Returns the entries of the exception table of `code`, with `start`, `end`
+    (exclusive) and `target` given as byte offsets.
+    """
+
+    data = code.co_exceptiontable
+    entries = []
+    position = 0
+
+    while position < len(data):
+        start, position = _parse_varint(data, position)
+        length, position = _parse_varint(data, position)
+        target, position = _parse_varint(data, position)
+        depth_lasti, position = _parse_varint(data, position)
+
+        # offsets are stored in code units
+        entries.append(ExceptionTableEntry(start * 2, (start + length) * 2,
+                                           target * 2, depth_lasti >> 1,
+                                           bool(depth_lasti & 1)))
+
+    entries.sort()
+    return entries
+
+
+class ExceptionTable:
+    """
+    An interval index over the entries of an exception table.
+    """
+
+    def __init__(self, code):
+        self.entries = parse_exception_table(code)
+        self.starts = array('i', (entry.start for entry in self.entries))
+
+    def handler_of(self, offset):
+        """
+        Returns the entry covering `offset`, or None if an exception raised
+        there leaves the function.
+        """
+
+        i = bisect_right(self.starts, offset) - 1
+
+        if i >= 0 and offset < self.entries[i].end:
+            return self.entries[i]
+
+        return None
+
+
+def compute_successors(instr, next_offset, table):
+    opname = instr.opname
+
+    if opname in ops.returns:
+        targets = [-1]
+
+    elif opname in ops.raises:
+        targets = []
+
+    elif opname in ops.unconditional_jumps:
+        targets = [instr.argval]
+
+    elif opname in ops.jumps:
+        targets = [next_offset, instr.argval]
+
+    else:
+        targets = [next_offset]
+
+    # the last instruction can't fall through
+    targets = [t for t in targets if t is not None]
+
+    if opname in ops.raises or opname not in ops.cannot_raise:
+        entry = table.handler_of(instr.offset)
+
+        if entry is not None:
+            targets.append(entry.target)
+        elif opname in ops.raises:
+            targets.append(-1)
+
+    return targets
+
+
+def _common_prefix_length(a, b):
+    # bisection over slice comparisons, which are done in C
+    lo, hi = 0, min(len(a), len(b))
+
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+
+        if a[lo:mid] == b[lo:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+
+    return lo
+
+
+def _instruction_at(offsets, position):
+    """
+    Returns the offset of the instruction containing byte `position`.
+    """
+
+    return offsets[bisect_right(offsets, position) - 1]
+
+
+def reusable_blocks(cfg, code, instructions, table):
+    """
+    Returns `(kept, start, end)` for rebuilding `cfg` for `code`, a new
+    version of the code object it was built from, whose instructions are
+    `instructions` and whose `ExceptionTable` is `table`.
+
+    Only the instructions of `code` in `range(start, end)` differ from the
+    old ones, or have a different next instruction or handler. `kept` maps
+    offsets of `code` to the basic blocks of `cfg` whose successors are the
+    same in `code`: the ones before `start`, and the ones after the edit,
+    moved by the change in the length of the code, unless one of their jumps
+    or handlers goes back across the edit.
+    """
+
+    old_code = cfg.code
+    old, new = old_code.co_code, code.co_code
+    old_entries = parse_exception_table(old_code)
+    new_entries = table.entries
+
+    if old == new and old_entries == new_entries:
+        kept = {offset: bb for offset, bb in cfg.basic_blocks.items()
+                if offset >= 0}
+        return kept, len(new), len(new)
+
+    offsets = [instr.offset for instr in instructions]
+    delta = len(new) - len(old)
+
+    prefix = _common_prefix_length(old, new)
+    suffix = min(_common_prefix_length(old[::-1], new[::-1]),
+                 min(len(old), len(new)) - prefix)
+
+    # the last common instruction gains or loses its next instruction if the
+    # edit is at the end
+    start = _instruction_at(offsets, min(prefix, len(old) - 1, len(new) - 1))
+
+    def clipped(entries):
+        return {(entry.start, min(entry.end, start), entry.target)
+                for entry in entries if entry.start < start}
+
+    changed = clipped(old_entries) ^ clipped(new_entries)
+    if changed:
+        start = _instruction_at(offsets, min(s for s, _, _ in changed))
+
+    # the first instruction after the edit which isn't extended by an
+    # EXTENDED_ARG from the edit
+    end = len(new)
+    for i in range(bisect_right(offsets, len(new) - suffix - 1), len(offsets)):
+        old_offset = offsets[i] - delta
+
+        if (i > 0 and instructions[i-1].opname != 'EXTENDED_ARG' and
+                old_offset >= 2 and old[old_offset - 2] != dis.EXTENDED_ARG):
+            end = offsets[i]
+            break
+
+    old_end = end - delta
+
+    # the handlers of the instructions after the edit, in offsets of `code`
+    def moved(entries, boundary, delta):
+        return [(max(entry.start, boundary) + delta, entry.end + delta,
+                 entry.target + delta if entry.target >= boundary
+                 else entry.target)
+                for entry in entries if entry.end > boundary]
+
+    if moved(old_entries, old_end, delta) != moved(new_entries, end, 0):
+        end, old_end = len(new), len(old)
+
+    boundaries = set(offsets)
+    kept = {}
+
+    for offset, bb in cfg.basic_blocks.items():
+        if 0 <= offset < start:
+            kept[offset] = bb
+        elif offset >= old_end and offset + delta in boundaries:
+            if any(0 <= succ < old_end for succ in bb.successors):
+                continue
+
+            bb.successors = [succ + delta if succ >= 0 else succ
+                             for succ in bb.successors]
+            kept[offset + delta] = bb
+
+    return kept, start, end
+
+
+def build_basic_blocks(cfg, code, kept=None, instructions=None, table=None):
+    """
+    Adds a basic block to `cfg` for every instruction of `code` which is
+    reachable from offset 0.
+
+    `kept` maps offsets to basic blocks whose successors are known to be the
+    same in `code`; they are reused (with their instructions refreshed) if
+    they are still reachable. `instructions` and `table` are the
+    instructions and the `ExceptionTable` of `code`, if they were already
+    computed.
+    """
+
+    from .cfg import BasicBlock, BlockStackView
+
+    if table is None:
+        table = ExceptionTable(code)
+
+    if instructions is None:
+        instructions = list(dis.get_instructions(code))
+
+    next_offsets = {}
+    for instr, next_instr in zip(instructions, instructions[1:]):
+        next_offsets[instr.offset] = next_instr.offset
+
+    by_offset = {instr.offset: instr for instr in instructions}
+    empty_view = BlockStackView(cfg._blockstack)
+
+    worklist = [0]
+    reached = {0}
+
+    kept = kept or {}
+
+    while worklist:
+        instr = by_offset[worklist.pop()]
+        bb = kept.get(instr.offset)
+
+        if bb is None:
+            bb = BasicBlock(instr, empty_view)
+            bb.successors = compute_successors(instr,
+                                               next_offsets.get(instr.offset),
+                                               table)
+        else:
+            bb.instruction = instr
+
+        cfg.basic_blocks[instr.offset] = bb
+
+        for succ in bb.successors:
+            if succ not in by_offset and succ != -1:
+                raise ValueError("Jump from {} to {}, which isn't the offset "
+                                 "of an instruction".format(instr.offset, succ))
+
+            if succ not in reached and succ != -1:
+                reached.add(succ)
+                worklist.append(succ)
+
+    # keep the basic blocks in order of offsets, like the block stack
+    # construction does
+    cfg.basic_blocks = {offset: cfg.basic_blocks[offset]
+                        for offset in [-1] + sorted(reached)}
@@ -0,0 +1,144 @@
+"""
+Structural fingerprints of code objects, and a corpus which builds one CFG
+per fingerprint.
+
+The fingerprint covers the opcodes, the arguments of jumps (and of the
+`EXTENDED_ARG`s which may extend them), and the exception table, which is
+everything the construction of a CFG looks at. Names, constants and other
+arguments are ignored, so two code objects with the same fingerprint have
+CFGs which only differ in their instructions' arguments, and whose nodes are
+at the same offsets.
+"""
+
+import dis
+import hashlib
+from collections import Counter, namedtuple
+
+from .cfg import CFG, BasicBlock
+
+
+CorpusStats = namedtuple('CorpusStats', 'functions unique saved largest_groups')
+
+# opcodes whose argument is part of the fingerprint
+_kept_args = bytes(0xFF if op == dis.EXTENDED_ARG or op in dis.hasjrel or
+                   op in dis.hasjabs else 0
+                   for op in range(256))
+
+
+def fingerprint(code):
+    """
+    Returns the structural fingerprint of `code` as 16 bytes.
+    """
+
+    co_code = code.co_code
+    opcodes = co_code[0::2]
+    args = co_code[1::2]
+
+    # mask the arguments with a single bitwise and instead of a loop
+    mask = opcodes.translate(_kept_args)
+    kept = int.from_bytes(args, 'little') & int.from_bytes(mask, 'little')
+
+    h = hashlib.blake2b(digest_size=16)
+    h.update(opcodes)
+    h.update(kept.to_bytes(len(args), 'little'))
+    h.update(getattr(code, 'co_exceptiontable', b''))
+
+    return h.digest()
+
+
+class CFGView:
+    """
+    The CFG of a code object, backed by the canonical CFG of its fingerprint.
+
+    The basic blocks of the view are built on first use. They have the
+    instructions of `code`, and share their successors, block stack views and
+    path metadata with the canonical CFG, as do the analyses (`dense_index`,
+    `loop_forest`...), which only depend on the structure of the CFG.
+    """
+
+    def __init__(self, code, canonical):
+        self.code = code
+        self.canonical = canonical
+
+        self._basic_blocks = None
+
+    @property
+    def basic_blocks(self):
+        if self._basic_blocks is None:
+            instructions = {instr.offset: instr
+                            for instr in dis.get_instructions(self.code)}
+
+            self._basic_blocks = {
+                offset: BasicBlock(instructions.get(offset, bb.instruction),
+                                   bb.blockstack_view, bb.successors,
+                                   bb.path_metadata)
+                for offset, bb in self.canonical.basic_blocks.items()
+            }
+
+        return self._basic_blocks
+
+    # these only go through `basic_blocks`
+    __iter__ = CFG.__iter__
+    __getitem__ = CFG.__getitem__
+    __contains__ = CFG.__contains__
+    filter = CFG.filter
+    topological = CFG.topological
+    to_dot = CFG.to_dot
+
+    def dense_index(self):
+        return self.canonical.dense_index()
+
+    def loop_forest(self):
+        return self.canonical.loop_forest()
+
+    def reachability(self):
+        return self.canonical.reachability()
+
+    def edge_number(self, edge, longest_first=False):
+        return self.canonical.edge_number(edge, longest_first)
+
+    def is_critical(self, edge):
+        return self.canonical.is_critical(edge)
+
+
+class CFGCorpus:
+    """
+    Builds CFGs for many code objects, building only one CFG for all the code
+    objects with the same fingerprint.
+    """
+
+    def __init__(self):
+        self._canonical = {}
+        self._counts = Counter()
+
+    def add(self, code):
+        """
+        Returns a `CFGView` of the CFG of `code`.
+        """
+
+        key = fingerprint(code)
+        canonical = self._canonical.get(key)
+
+        if canonical is None:
+            canonical = self._canonical[key] = CFG(code)
+
+        self._counts[key] += 1
+
+        return CFGView(code, canonical)
+
+    def __len__(self):
+        return len(self._canonical)
+
+    def stats(self, top=10):
+        """
+        Returns a `CorpusStats` with the number of code objects added, the
+        number of CFGs built for them, the number of builds saved, and the
+        `top` largest groups of code objects sharing a fingerprint, as
+        `(fingerprint, count)` pairs.
+        """
+
+        functions = sum(self._counts.values())
+
+        return CorpusStats(functions, len(self._canonical),
+                           functions - len(self._canonical),
+                           self._counts.most_common(top))
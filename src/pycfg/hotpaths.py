@@ -0,0 +1,436 @@
+"""
+Hot paths and superblock candidates from edge or Ball-Larus path profiles.
+
+Paths are acyclic in the sense of Ball and Larus: the retreating edges of the
+CFG are removed, and every retreating edge `v -> w` is replaced by a dummy
+edge from the entry to `w` and a dummy edge from `v` to the exit. A path thus
+starts either at offset 0 or at a loop header, and ends either at the exit or
+at the source of a retreating edge.
+"""
+
+import heapq
+from array import array
+from collections import namedtuple
+
+
+BallLarusPath = namedtuple('BallLarusPath', 'offsets from_loop_header to_back_edge')
+
+HotPath = namedtuple('HotPath', 'count path')
+
+Trace = namedtuple('Trace', 'offsets count side_entrances')
+
+
+# kinds of edges in the acyclic graph
+REAL_EDGE = 0
+ENTRY_EDGE = 1
+EXIT_EDGE = 2
+
+
+class BallLarus:
+    """
+    The Ball-Larus numbering of the acyclic paths of a CFG.
+
+    The sum of the values of the edges along a path is its id, and the ids
+    of all the paths are exactly `range(num_paths)`. The out-edges of node `i`
+    of the CFG's `DenseIndex` are at positions `start[i]:start[i+1]` of
+    `target`, `kind` and `values`.
+    """
+
+    def __init__(self, cfg):
+        index = cfg.dense_index()
+        self._index = index
+
+        self.entry = index.positions[0]
+        self.exit = index.positions[-1]
+
+        retreating = index.retreating_edges()
+        self._retreating = retreating
+
+        headers = sorted({index.succ[e] for e in retreating} - {self.entry})
+        latches = {i for i in range(len(index))
+                   if any(e in retreating for e in
+                          range(index.succ_start[i], index.succ_start[i+1]))}
+
+        self.start = array('I', [0])
+        self.target = array('I')
+        self.kind = bytearray()
+
+        for i in range(len(index)):
+            if i == self.entry:
+                for h in headers:
+                    self.target.append(h)
+                    self.kind.append(ENTRY_EDGE)
+
+            for e in range(index.succ_start[i], index.succ_start[i+1]):
+                if e not in retreating:
+                    self.target.append(index.succ[e])
+                    self.kind.append(REAL_EDGE)
+
+            if i in latches and i != self.exit:
+                self.target.append(self.exit)
+                self.kind.append(EXIT_EDGE)
+
+            self.start.append(len(self.target))
+
+        # path counts can outgrow any fixed width integer
+        self.values = [0] * len(self.target)
+        self.num_paths_from = [0] * len(index)
+
+        for i in self._postorder():
+            if i == self.exit:
+                self.num_paths_from[i] = 1
+                continue
+
+            n = 0
+            for e in range(self.start[i], self.start[i+1]):
+                self.values[e] = n
+                n += self.num_paths_from[self.target[e]]
+
+            self.num_paths_from[i] = n
+
+        self.num_paths = self.num_paths_from[self.entry]
+
+    def _postorder(self):
+        order = []
+        visited = bytearray(len(self._index))
+        visited[self.entry] = 1
+        stack = [(self.entry, self.start[self.entry])]
+
+        while stack:
+            i, e = stack[-1]
+
+            if e < self.start[i+1]:
+                stack[-1] = (i, e + 1)
+                j = self.target[e]
+
+                if not visited[j]:
+                    visited[j] = 1
+                    stack.append((j, self.start[j]))
+            else:
+                stack.pop()
+                order.append(i)
+
+        return order
+
+    def edge_values(self):
+        """
+        Returns the value of every edge of the acyclic graph which is also an
+        edge of the CFG, keyed by `(start, end)` offsets.
+        """
+
+        offsets = self._index.offsets
+        values = {}
+
+        for i in range(len(self._index)):
+            for e in range(self.start[i], self.start[i+1]):
+                if self.kind[e] == REAL_EDGE:
+                    values[offsets[i], offsets[self.target[e]]] = self.values[e]
+
+        return values
+
+    def back_edge_values(self):
+        """
+        Returns `(end, restart)` for every retreating edge `(start, end)` of the
+        CFG: `end` is added to the path id before the path is counted, and the
+        path id is then reset to `restart`.
+        """
+
+        index = self._index
+        offsets = index.offsets
+        entry_values = {}
+        exit_values = {}
+
+        for i in range(len(index)):
+            for e in range(self.start[i], self.start[i+1]):
+                if self.kind[e] == ENTRY_EDGE:
+                    entry_values[self.target[e]] = self.values[e]
+                elif self.kind[e] == EXIT_EDGE:
+                    exit_values[i] = self.values[e]
+
+        values = {}
+
+        for i in range(len(index)):
+            for e in range(index.succ_start[i], index.succ_start[i+1]):
+                if e in self._retreating:
+                    j = index.succ[e]
+                    values[offsets[i], offsets[j]] = (exit_values.get(i, 0),
+                                                      entry_values.get(j, 0))
+
+        return values
+
+    def path(self, path_id):
+        """
+        Returns the `BallLarusPath` with id `path_id`.
+        """
+
+        if not 0 <= path_id < self.num_paths:
+            raise ValueError("Path id must be in range(%d)" % self.num_paths)
+
+        offsets = self._index.offsets
+        i = self.entry
+        nodes = [offsets[i]]
+        from_loop_header = False
+        r = path_id
+
+        while i != self.exit:
+            chosen = self.start[i]
+
+            for e in range(self.start[i], self.start[i+1]):
+                if self.values[e] <= r and self.num_paths_from[self.target[e]]:
+                    chosen = e
+
+            r -= self.values[chosen]
+            kind = self.kind[chosen]
+            i = self.target[chosen]
+
+            if kind == ENTRY_EDGE:
+                from_loop_header = True
+                nodes = [offsets[i]]
+            elif kind == EXIT_EDGE:
+                return BallLarusPath(tuple(nodes), from_loop_header, True)
+            else:
+                nodes.append(offsets[i])
+
+        return BallLarusPath(tuple(nodes), from_loop_header, False)
+
+
+def _edge_weights(ball_larus, edge_counts):
+    """
+    Returns the count of every edge of the acyclic graph, given the counts of
+    the edges of the CFG. Dummy edges get the counts of the retreating edges
+    they replace.
+    """
+
+    index = ball_larus._index
+    offsets = index.offsets
+    weights = [0] * len(ball_larus.target)
+    into_header = {}
+    from_latch = {}
+
+    for i in range(len(index)):
+        for e in range(index.succ_start[i], index.succ_start[i+1]):
+            if e in ball_larus._retreating:
+                j = index.succ[e]
+                count = edge_counts.get((offsets[i], offsets[j]), 0)
+                into_header[j] = into_header.get(j, 0) + count
+                from_latch[i] = from_latch.get(i, 0) + count
+
+    for i in range(len(index)):
+        for e in range(ball_larus.start[i], ball_larus.start[i+1]):
+            kind = ball_larus.kind[e]
+            j = ball_larus.target[e]
+
+            if kind == ENTRY_EDGE:
+                weights[e] = into_header.get(j, 0)
+            elif kind == EXIT_EDGE:
+                weights[e] = from_latch.get(i, 0)
+            else:
+                weights[e] = edge_counts.get((offsets[i], offsets[j]), 0)
+
+    return weights
+
+
+def hottest_paths(cfg, edge_counts=None, path_counts=None, k=10,
+                  ball_larus=None):
+    """
+    Returns the `k` hottest acyclic paths of `cfg` as a list of `HotPath`s,
+    hottest first.
+
+    `path_counts` maps Ball-Larus path ids to counts, and gives exact path
+    frequencies. Otherwise `edge_counts`, which maps `(start, end)` offset
+    pairs to counts, is used, and the count of a path is estimated as the
+    smallest count of any edge on it. Paths with a count of zero are never
+    returned.
+    """
+
+    if ball_larus is None:
+        ball_larus = BallLarus(cfg)
+
+    if path_counts is not None:
+        hottest = heapq.nlargest(k, ((count, path_id)
+                                     for path_id, count in path_counts.items()
+                                     if count > 0))
+
+        return [HotPath(count, ball_larus.path(path_id))
+                for count, path_id in hottest]
+
+    if edge_counts is None:
+        raise ValueError("Either edge_counts or path_counts must be given")
+
+    weights = _edge_weights(ball_larus, edge_counts)
+    offsets = ball_larus._index.offsets
+    start, target, kind = ball_larus.start, ball_larus.target, ball_larus.kind
+
+    # the largest bottleneck of any path from every node to the exit, in
+    # postorder so the targets of a node's edges come first
+    widest = [0] * len(ball_larus._index)
+
+    for i in ball_larus._postorder():
+        if i == ball_larus.exit:
+            widest[i] = float('inf')
+            continue
+
+        for e in range(start[i], start[i+1]):
+            widest[i] = max(widest[i], min(weights[e], widest[target[e]]))
+
+    # A partial path is taken off the heap in order of the largest count of
+    # the complete paths extending it, its bottleneck capped by the widest
+    # path from its last node, so complete paths come off the heap in order of
+    # their counts. Ties go to the most recently pushed path, which follows
+    # one path down to the exit instead of extending every partial path with
+    # the same count. Partial paths share their prefixes through linked
+    # (node, parent) pairs.
+    entry = ball_larus.entry
+    heap = [(-widest[entry], 0, float('inf'), entry, (entry, None), False,
+             False)]
+    tiebreak = -1
+    hot = []
+
+    while heap and len(hot) < k:
+        neg_bound, _, count, i, prefix, from_header, to_back_edge = \
+            heapq.heappop(heap)
+
+        if neg_bound == 0:
+            break
+
+        if i == ball_larus.exit:
+            nodes = []
+            while prefix is not None:
+                node, prefix = prefix
+                nodes.append(offsets[node])
+
+            if to_back_edge:
+                # the exit node was only reached through a dummy edge
+                nodes = nodes[1:]
+
+            nodes.reverse()
+            path = BallLarusPath(tuple(nodes), from_header, to_back_edge)
+            hot.append(HotPath(count, path))
+            continue
+
+        for e in range(start[i], start[i+1]):
+            j = target[e]
+            extended_count = min(count, weights[e])
+            bound = min(extended_count, widest[j])
+
+            if bound <= 0:
+                continue
+
+            if kind[e] == ENTRY_EDGE:
+                extended = (j, None), True, False
+            else:
+                extended = (j, prefix), from_header, kind[e] == EXIT_EDGE
+
+            heapq.heappush(heap, (-bound, tiebreak, extended_count, j) +
+                           extended)
+            tiebreak -= 1
+
+    return hot
+
+
+def superblocks(cfg, edge_counts, min_probability=0.5, limit=None):
+    """
+    Greedily forms traces of hot nodes which are candidates for superblocks,
+    returned as a list of `Trace`s, hottest seed first.
+
+    Starting from the hottest node not yet in a trace, a trace is grown
+    forward along the most frequent outgoing edge, and backward along the most
+    frequent incoming edge, as long as the edge is taken with at least
+    `min_probability` from both of its ends and doesn't close a cycle. The
+    side entrances of a trace are the edges into it which don't come from the
+    previous node of the trace; they must be removed by tail duplication to
+    turn the trace into a superblock.
+    """
+
+    index = cfg.dense_index()
+    offsets = index.offsets
+    retreating = index.retreating_edges()
+    n = len(index)
+
+    counts = array('d', [0.0]) * index.num_edges
+    for e, edge in enumerate(index.edges()):
+        counts[e] = edge_counts.get(edge, 0)
+
+    weight = array('d', [0.0]) * n
+    for i in range(n):
+        for e in range(index.succ_start[i], index.succ_start[i+1]):
+            weight[index.succ[e]] += counts[e]
+
+    entry = index.positions[0]
+    weight[entry] = max(weight[entry],
+                        sum(counts[index.succ_start[entry]:index.succ_start[entry+1]]))
+
+    # edge ids of the incoming edges of every node, parallel to `pred`
+    in_edges = array('I', [0]) * index.num_edges
+    fill = array('I', index.pred_start[:n])
+    for i in range(n):
+        for e in range(index.succ_start[i], index.succ_start[i+1]):
+            j = index.succ[e]
+            in_edges[fill[j]] = e
+            fill[j] += 1
+
+    def likely(e, source, target):
+        return (e not in retreating and counts[e] > 0
+                and counts[e] >= min_probability * weight[source]
+                and counts[e] >= min_probability * weight[target])
+
+    in_trace = bytearray(n)
+    heap = [(-weight[i], i) for i in range(n) if weight[i] > 0]
+    heapq.heapify(heap)
+    traces = []
+
+    while heap and (limit is None or len(traces) < limit):
+        _, seed = heapq.heappop(heap)
+
+        if in_trace[seed]:
+            continue
+
+        in_trace[seed] = 1
+        forward = [seed]
+
+        i = seed
+        while True:
+            edges = range(index.succ_start[i], index.succ_start[i+1])
+            e = max(edges, key=lambda e: counts[e], default=None)
+
+            if e is None or in_trace[index.succ[e]] \
+                    or not likely(e, i, index.succ[e]):
+                break
+
+            i = index.succ[e]
+            in_trace[i] = 1
+            forward.append(i)
+
+        backward = []
+        i = seed
+        while True:
+            edges = in_edges[index.pred_start[i]:index.pred_start[i+1]]
+            position = max(range(len(edges)), key=lambda p: counts[edges[p]],
+                           default=None)
+
+            if position is None:
+                break
+
+            e = edges[position]
+            p = index.pred[index.pred_start[i] + position]
+
+            if in_trace[p] or not likely(e, p, i):
+                break
+
+            i = p
+            in_trace[i] = 1
+            backward.append(i)
+
+        backward.reverse()
+        trace = backward + forward
+
+        side_entrances = []
+        for position, i in enumerate(trace[1:], 1):
+            for p in index.predecessors(i):
+                if p != trace[position-1]:
+                    side_entrances.append((offsets[p], offsets[i]))
+
+        traces.append(Trace(tuple(offsets[i] for i in trace), weight[seed],
+                            tuple(side_entrances)))
+
+    return traces
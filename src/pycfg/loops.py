@@ -0,0 +1,223 @@
+"""
+Natural loops of a CFG, found from its back edges and arranged into a
+loop-nest forest.
+"""
+
+from array import array
+
+
+def immediate_dominators(index):
+    """
+    Computes the immediate dominators of the nodes of a `DenseIndex` which are
+    reachable from offset 0, using the iterative algorithm of Cooper, Harvey
+    and Kennedy.
+
+    Returns `(rpo, idom)`, where `rpo` is the list of reachable nodes in
+    reverse postorder and `idom[i]` is the immediate dominator of node `i`
+    (the root is its own dominator, and unreachable nodes have -1).
+    """
+
+    rpo = index.reverse_postorder()
+    rpo_num = array('i', [-1] * len(index))
+
+    for n, i in enumerate(rpo):
+        rpo_num[i] = n
+
+    root = rpo[0]
+    idom = array('i', [-1] * len(index))
+    idom[root] = root
+
+    def intersect(a, b):
+        while a != b:
+            while rpo_num[a] > rpo_num[b]:
+                a = idom[a]
+            while rpo_num[b] > rpo_num[a]:
+                b = idom[b]
+        return a
+
+    changed = True
+    while changed:
+        changed = False
+
+        for i in rpo[1:]:
+            new_idom = -1
+
+            for p in index.predecessors(i):
+                if idom[p] == -1:
+                    continue
+
+                if new_idom == -1:
+                    new_idom = p
+                else:
+                    new_idom = intersect(p, new_idom)
+
+            if idom[i] != new_idom:
+                idom[i] = new_idom
+                changed = True
+
+    return rpo, idom
+
+
+class Loop:
+    """
+    A natural loop. `body` is a bitset over the node indices of the CFG's
+    `DenseIndex`, and `header`, `back_edges` and `exits` are given as offsets.
+    """
+
+    __slots__ = ('header', 'body', 'back_edges', 'exits', 'parent', 'children',
+                 'depth', '_index')
+
+    def __init__(self, header, body, back_edges, index):
+        self.header = header
+        self.body = body
+        self.back_edges = back_edges
+        self.exits = ()
+        self.parent = None
+        self.children = []
+        self.depth = 1
+
+        self._index = index
+
+    def __contains__(self, offset):
+        i = self._index.positions.get(offset)
+
+        if i is None:
+            return False
+
+        return bool(self.body >> i & 1)
+
+    def __len__(self):
+        return bin(self.body).count('1')
+
+    def offsets(self):
+        """
+        Returns the offsets of the nodes in the body of the loop, in
+        ascending order.
+        """
+
+        return [offset for i, offset in enumerate(self._index.offsets)
+                if self.body >> i & 1]
+
+    def __str__(self):
+        return "Loop(header={}, depth={}, size={})".format(
+            self.header, self.depth, len(self))
+
+    __repr__ = __str__
+
+
+class LoopForest:
+    """
+    The natural loops of a CFG, nested by containment.
+
+    Loops which share a header are merged into one, and retreating edges of
+    irreducible regions (whose target doesn't dominate their source) are not
+    treated as back edges.
+    """
+
+    def __init__(self, cfg):
+        index = cfg.dense_index()
+        self._index = index
+
+        rpo, idom = immediate_dominators(index)
+
+        def dominates(a, b):
+            while True:
+                if a == b:
+                    return True
+                if idom[b] == b:
+                    return False
+                b = idom[b]
+
+        # header -> list of back edge sources
+        latches = {}
+
+        for i in rpo:
+            for h in index.successors(i):
+                if dominates(h, i):
+                    latches.setdefault(h, []).append(i)
+
+        loops = []
+
+        for h, sources in latches.items():
+            body = 1 << h
+            worklist = [s for s in sources if s != h]
+
+            for s in worklist:
+                body |= 1 << s
+
+            while worklist:
+                i = worklist.pop()
+
+                for p in index.predecessors(i):
+                    if idom[p] != -1 and not body >> p & 1:
+                        body |= 1 << p
+                        worklist.append(p)
+
+            back_edges = tuple((index.offsets[s], index.offsets[h])
+                               for s in sources)
+            loops.append(Loop(index.offsets[h], body, back_edges, index))
+
+        # Outer loops are strictly larger than the loops nested in them, so
+        # visiting them first leaves the innermost loop of every node last.
+        loops.sort(key=lambda l: (-len(l), l.header))
+
+        self.innermost = array('i', [-1] * len(index))
+
+        for n, loop in enumerate(loops):
+            h = index.positions[loop.header]
+            parent = self.innermost[h]
+
+            if parent != -1:
+                loop.parent = loops[parent]
+                loop.depth = loop.parent.depth + 1
+                loop.parent.children.append(loop)
+
+            exits = []
+
+            for i in range(len(index)):
+                if not loop.body >> i & 1:
+                    continue
+
+                self.innermost[i] = n
+
+                for j in index.successors(i):
+                    if not loop.body >> j & 1:
+                        exits.append((index.offsets[i], index.offsets[j]))
+
+            loop.exits = tuple(exits)
+
+        self.loops = loops
+        self.roots = [loop for loop in loops if loop.parent is None]
+
+    def __iter__(self):
+        return iter(self.loops)
+
+    def __len__(self):
+        return len(self.loops)
+
+    def loop_of(self, offset):
+        """
+        Returns the innermost loop containing `offset`, or None.
+        """
+
+        n = self.innermost[self._index.positions[offset]]
+
+        if n == -1:
+            return None
+
+        return self.loops[n]
+
+    def depth(self, offset):
+        """
+        Returns the number of loops containing `offset`.
+        """
+
+        loop = self.loop_of(offset)
+
+        if loop is None:
+            return 0
+
+        return loop.depth
+
+    def back_edges(self):
+        return {edge for loop in self.loops for edge in loop.back_edges}
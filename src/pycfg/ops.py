@@ -106,3 +106,68 @@ boring_opnames = {
 }
 
 jumps = {dis.opname[i] for i in dis.hasjabs + dis.hasjrel}
+
+# ops which push a block onto the block stack
+block_setups = {
+    'SETUP_FINALLY',
+    'SETUP_EXCEPT',
+    'SETUP_LOOP',
+    'SETUP_WITH',
+}
+
+# ops used by the exception table construction (see exceptiontable.py)
+returns = {
+    'RETURN_VALUE',
+    'RETURN_CONST',
+}
+
+raises = {
+    'RAISE_VARARGS',
+    'RERAISE',
+}
+
+unconditional_jumps = {
+    'JUMP_FORWARD',
+    'JUMP_BACKWARD',
+    'JUMP_BACKWARD_NO_INTERRUPT',
+    'JUMP_ABSOLUTE',
+    'JUMP',
+    'JUMP_NO_INTERRUPT',
+}
+
+# ops which access local variables (see dataflow.py). LOAD_FAST_AND_CLEAR
+# reads a local and then unbinds it, so it's both a load and a delete.
+local_loads = {
+    'LOAD_FAST',
+    'LOAD_FAST_CHECK',
+    'LOAD_FAST_AND_CLEAR',
+}
+
+local_stores = {
+    'STORE_FAST',
+    'STORE_FAST_MAYBE_NULL',
+}
+
+local_deletes = {
+    'DELETE_FAST',
+    'LOAD_FAST_AND_CLEAR',
+}
+
+# ops which access two locals, packed into the 4-bit halves of their argument
+local_pairs = {
+    'LOAD_FAST_LOAD_FAST': ('load', 'load'),
+    'STORE_FAST_LOAD_FAST': ('store', 'load'),
+    'STORE_FAST_STORE_FAST': ('store', 'store'),
+}
+
+# ops which never send control to an exception handler
+cannot_raise = {
+    'NOP',
+    'CACHE',
+    'EXTENDED_ARG',
+    'JUMP_FORWARD',
+    'RETURN_VALUE',
+    'RETURN_CONST',
+    'POP_EXCEPT',
+    'PUSH_NULL',
+}
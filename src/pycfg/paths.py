@@ -0,0 +1,212 @@
+"""
+Enumeration and counting of the acyclic paths of a CFG from offset 0 to the
+exit node (-1).
+
+A path is acyclic if it doesn't take any of the CFG's retreating edges (see
+`DenseIndex.retreating_edges`), so every loop is entered at most once and
+left without going around it again.
+"""
+
+
+class _AcyclicGraph:
+    """
+    The successors of every node of a CFG without its retreating edges, and
+    the nodes reachable from every node, as bitsets.
+    """
+
+    def __init__(self, cfg):
+        index = cfg.dense_index()
+        retreating = index.retreating_edges()
+
+        self.index = index
+        self.entry = index.positions[0]
+        self.exit = index.positions[-1]
+
+        # (edge id, successor) pairs
+        self.successors = [
+            [(e, index.succ[e])
+             for e in range(index.succ_start[i], index.succ_start[i+1])
+             if e not in retreating]
+            for i in range(len(index))
+        ]
+
+        self.postorder = self._postorder()
+
+        self.reach = [0] * len(index)
+        for i in self.postorder:
+            bits = 1 << i
+            for _, j in self.successors[i]:
+                bits |= self.reach[j]
+            self.reach[i] = bits
+
+    def _postorder(self):
+        """
+        Returns all the nodes, each one after all of its successors.
+        """
+
+        order = []
+        visited = bytearray(len(self.index))
+
+        for root in [self.entry] + list(range(len(self.index))):
+            if visited[root]:
+                continue
+
+            visited[root] = 1
+            stack = [(root, 0)]
+
+            while stack:
+                i, k = stack[-1]
+
+                if k < len(self.successors[i]):
+                    stack[-1] = (i, k + 1)
+                    j = self.successors[i][k][1]
+
+                    if not visited[j]:
+                        visited[j] = 1
+                        stack.append((j, 0))
+                else:
+                    stack.pop()
+                    order.append(i)
+
+        return order
+
+    def count(self, target):
+        """
+        Returns the number of paths from every node to `target`.
+        """
+
+        counts = [0] * len(self.index)
+        counts[target] = 1
+
+        for i in self.postorder:
+            if i != target:
+                counts[i] = sum(counts[j] for _, j in self.successors[i])
+
+        return counts
+
+
+def acyclic_paths(cfg, max_length=None, must_pass=(), covered_edges=None):
+    """
+    Lazily yields the acyclic paths of `cfg` from offset 0 to the exit, as
+    tuples of offsets.
+
+    Paths are found depth-first and share their prefix on a single stack, so
+    memory is proportional to the length of the longest path. Branches are
+    pruned early when they can't lead to a path which
+
+    - has at most `max_length` nodes,
+    - goes through every offset in `must_pass`, and
+    - takes at least one edge which isn't in `covered_edges` (a collection of
+      `(start, end)` offset pairs), if it's given.
+    """
+
+    graph = _AcyclicGraph(cfg)
+    index = graph.index
+    offsets = index.offsets
+
+    required = 0
+    for offset in must_pass:
+        required |= 1 << index.positions[offset]
+
+    # whether every edge id is uncovered, and whether an uncovered edge can
+    # be reached from every node
+    uncovered = None
+    leads_to_uncovered = None
+
+    if covered_edges is not None:
+        covered = set()
+        for edge in covered_edges:
+            try:
+                covered.add(index.edge_id(edge))
+            except KeyError:
+                pass
+
+        uncovered = bytearray(0 if e in covered else 1
+                              for e in range(index.num_edges))
+        leads_to_uncovered = bytearray(len(index))
+
+        for i in graph.postorder:
+            leads_to_uncovered[i] = any(uncovered[e] or leads_to_uncovered[j]
+                                        for e, j in graph.successors[i])
+
+    def viable(e, j, mask, uncovered_count):
+        if not graph.reach[j] >> graph.exit & 1:
+            return False
+
+        if required & ~mask & ~graph.reach[j]:
+            return False
+
+        if uncovered is not None and not uncovered_count \
+                and not uncovered[e] and not leads_to_uncovered[j]:
+            return False
+
+        return True
+
+    entry = graph.entry
+    mask = required & (1 << entry)
+    uncovered_count = 0
+
+    if uncovered is not None and not leads_to_uncovered[entry]:
+        return
+    if required & ~graph.reach[entry]:
+        return
+
+    path = [entry]
+    # (node, position of the next successor, must-pass mask, uncovered count)
+    stack = [(entry, 0, mask, uncovered_count)]
+
+    while stack:
+        i, k, mask, uncovered_count = stack[-1]
+
+        if i == graph.exit:
+            if mask == required:
+                yield tuple(offsets[n] for n in path)
+
+            stack.pop()
+            path.pop()
+            continue
+
+        if k == len(graph.successors[i]) or \
+                (max_length is not None and len(path) >= max_length):
+            stack.pop()
+            path.pop()
+            continue
+
+        stack[-1] = (i, k + 1, mask, uncovered_count)
+        e, j = graph.successors[i][k]
+
+        new_mask = mask | (required & (1 << j))
+        new_count = uncovered_count + (uncovered[e] if uncovered else 0)
+
+        if viable(e, j, new_mask, new_count):
+            path.append(j)
+            stack.append((j, 0, new_mask, new_count))
+
+
+def count_paths(cfg, must_pass=()):
+    """
+    Returns the number of acyclic paths of `cfg` from offset 0 to the exit
+    which go through every offset in `must_pass`, without enumerating them.
+    """
+
+    graph = _AcyclicGraph(cfg)
+    positions = graph.index.positions
+
+    # The nodes a path must go through are visited in topological order, so
+    # the count is the product of the counts of the segments between them.
+    topological = {i: n for n, i in enumerate(reversed(graph.postorder))}
+    stops = sorted({positions[offset] for offset in must_pass},
+                   key=topological.__getitem__)
+    stops = [graph.entry] + stops + [graph.exit]
+
+    total = 1
+    for source, target in zip(stops, stops[1:]):
+        if source == target:
+            continue
+
+        total *= graph.count(target)[source]
+
+        if not total:
+            break
+
+    return total
@@ -0,0 +1,180 @@
+"""
+Forward and backward reachability between the nodes of a CFG.
+
+The strongly connected components of the CFG are found first, and their
+reachability sets are then computed in topological order of the condensed
+graph, as bitsets over the node indices of the CFG's `DenseIndex`. Every node
+reaches itself.
+"""
+
+from array import array
+
+
+def strongly_connected_components(index):
+    """
+    Finds the strongly connected components of a `DenseIndex` with Tarjan's
+    algorithm.
+
+    Returns `(component, count)`, where `component[i]` is the component of
+    node `i`. Components are numbered in reverse topological order, so every
+    edge goes from a component to one with a number no greater than its own.
+    """
+
+    n = len(index)
+    component = array('i', [-1]) * n
+    lowlink = array('i', [0]) * n
+    number = array('i', [-1]) * n
+    on_stack = bytearray(n)
+    stack = []
+    count = 0
+    counter = 0
+
+    for root in range(n):
+        if number[root] != -1:
+            continue
+
+        number[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = 1
+        work = [(root, index.succ_start[root])]
+
+        while work:
+            i, e = work[-1]
+
+            if e < index.succ_start[i+1]:
+                work[-1] = (i, e + 1)
+                j = index.succ[e]
+
+                if number[j] == -1:
+                    number[j] = lowlink[j] = counter
+                    counter += 1
+                    stack.append(j)
+                    on_stack[j] = 1
+                    work.append((j, index.succ_start[j]))
+                elif on_stack[j]:
+                    lowlink[i] = min(lowlink[i], number[j])
+
+                continue
+
+            work.pop()
+
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[i])
+
+            if lowlink[i] == number[i]:
+                while True:
+                    j = stack.pop()
+                    on_stack[j] = 0
+                    component[j] = count
+                    if j == i:
+                        break
+
+                count += 1
+
+    return component, count
+
+
+class ReachabilityIndex:
+    def __init__(self, cfg):
+        index = cfg.dense_index()
+        self._index = index
+
+        self.component, count = strongly_connected_components(index)
+        n = len(index)
+
+        members = [0] * count
+        for i in range(n):
+            members[self.component[i]] |= 1 << i
+
+        succ_components = [set() for _ in range(count)]
+        pred_components = [set() for _ in range(count)]
+
+        for i in range(n):
+            c = self.component[i]
+
+            for j in index.successors(i):
+                d = self.component[j]
+
+                if c != d:
+                    succ_components[c].add(d)
+                    pred_components[d].add(c)
+
+        # components are numbered sinks first
+        self.forward = list(members)
+        for c in range(count):
+            for d in succ_components[c]:
+                self.forward[c] |= self.forward[d]
+
+        self.backward = list(members)
+        for c in reversed(range(count)):
+            for d in pred_components[c]:
+                self.backward[c] |= self.backward[d]
+
+        # byte rows make single bit lookups independent of the CFG's size
+        nbytes = (n + 7) // 8
+        self._forward_rows = [bits.to_bytes(nbytes, 'little')
+                              for bits in self.forward]
+
+    def can_reach(self, start, end):
+        """
+        Returns whether there's a path from offset `start` to offset `end`.
+        """
+
+        positions = self._index.positions
+        row = self._forward_rows[self.component[positions[start]]]
+        j = positions[end]
+
+        return bool(row[j >> 3] >> (j & 7) & 1)
+
+    def forward_bits(self, *offsets):
+        """
+        Returns the bitset of the nodes reachable from any of `offsets`.
+        """
+
+        bits = 0
+        for offset in offsets:
+            bits |= self.forward[self.component[self._index.positions[offset]]]
+
+        return bits
+
+    def backward_bits(self, *offsets):
+        """
+        Returns the bitset of the nodes which can reach any of `offsets`.
+        """
+
+        bits = 0
+        for offset in offsets:
+            bits |= self.backward[self.component[self._index.positions[offset]]]
+
+        return bits
+
+    def bits_of(self, offsets):
+        """
+        Returns the bitset of `offsets`.
+        """
+
+        bits = 0
+        for offset in offsets:
+            bits |= 1 << self._index.positions[offset]
+
+        return bits
+
+    def offsets_of(self, bits):
+        """
+        Returns the offsets of the nodes in the bitset `bits`, in ascending
+        order.
+        """
+
+        offsets = self._index.offsets
+        return [offsets[i] for i in range(len(offsets)) if bits >> i & 1]
+
+    def reachable_from(self, *offsets):
+        return self.offsets_of(self.forward_bits(*offsets))
+
+    def reaching(self, *offsets):
+        return self.offsets_of(self.backward_bits(*offsets))
+
+    def reaching_exit(self):
+        return self.reaching(-1)
@@ -0,0 +1,232 @@
+"""
+A statistical profiler which periodically samples the position (`f_lasti`) of
+the frames running the code objects of some CFGs, and counts the samples per
+node.
+
+Samples are taken either by a background thread, which sees the frames of
+all the other threads, or by a profiling timer signal, which only sees the
+frames of the main thread. The sampling interval trades accuracy for
+overhead.
+"""
+
+import dis
+import signal
+import sys
+import threading
+import time
+from array import array
+
+
+class _Target:
+    __slots__ = ('cfg', 'node_of', 'counts')
+
+    def __init__(self, cfg):
+        index = cfg.dense_index()
+
+        self.cfg = cfg
+
+        # the node of every byte offset in the code, or -1 for the offsets of
+        # unreachable instructions. The inline caches after an instruction
+        # (3.11+) belong to its node.
+        self.node_of = array('i', [-1]) * len(cfg.code.co_code)
+        starts = [instr.offset for instr in dis.get_instructions(cfg.code)]
+
+        for start, end in zip(starts, starts[1:] + [len(self.node_of)]):
+            i = index.positions.get(start)
+
+            if i is not None:
+                for offset in range(start, end):
+                    self.node_of[offset] = i
+
+        self.counts = array('Q', [0]) * len(index)
+
+
+class SamplingProfiler:
+    """
+    Samples the frames running the code objects of `cfgs` every `interval`
+    seconds, using a background thread (`mode='thread'`) or the `SIGPROF`
+    timer (`mode='signal'`, which must be started from the main thread).
+
+    Every target frame on the stack is sampled, so a node which calls another
+    target function is counted while the callee runs.
+    """
+
+    def __init__(self, cfgs, interval=0.005, mode='thread'):
+        if mode not in ('thread', 'signal'):
+            raise ValueError("mode must be 'thread' or 'signal'")
+
+        self.interval = interval
+        self.mode = mode
+
+        self.samples = 0
+
+        self._targets = {id(cfg.code): _Target(cfg) for cfg in cfgs}
+        self._running = False
+        self._thread = None
+        self._previous_handler = None
+
+    def _sample(self, frame):
+        targets = self._targets
+
+        while frame is not None:
+            target = targets.get(id(frame.f_code))
+
+            if target is not None and 0 <= frame.f_lasti < len(target.node_of):
+                i = target.node_of[frame.f_lasti]
+
+                if i != -1:
+                    target.counts[i] += 1
+                    self.samples += 1
+
+            frame = frame.f_back
+
+    def _run_thread(self):
+        own_id = threading.get_ident()
+
+        while self._running:
+            time.sleep(self.interval)
+
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_id:
+                    self._sample(frame)
+
+    def _handle_signal(self, signum, frame):
+        self._sample(frame)
+
+    def start(self):
+        if self._running:
+            return
+
+        self._running = True
+
+        if self.mode == 'thread':
+            self._thread = threading.Thread(target=self._run_thread,
+                                            name='pycfg-sampler', daemon=True)
+            self._thread.start()
+        else:
+            self._previous_handler = signal.signal(signal.SIGPROF,
+                                                   self._handle_signal)
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        if not self._running:
+            return
+
+        self._running = False
+
+        if self.mode == 'thread':
+            self._thread.join()
+            self._thread = None
+        else:
+            signal.setitimer(signal.ITIMER_PROF, 0, 0)
+            signal.signal(signal.SIGPROF, self._previous_handler)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def block_counts(self, code):
+        """
+        Returns the number of samples taken at every node of the CFG of
+        `code`, keyed by offset.
+        """
+
+        target = self._targets[id(code)]
+        offsets = target.cfg.dense_index().offsets
+
+        return {offsets[i]: count for i, count in enumerate(target.counts)}
+
+    def edge_counts(self, code):
+        """
+        Returns the edge counts of the CFG of `code` estimated from its block
+        counts, as given by `estimate_edge_counts`.
+        """
+
+        target = self._targets[id(code)]
+        return estimate_edge_counts(target.cfg, self.block_counts(code))
+
+
+def estimate_edge_counts(cfg, block_counts):
+    """
+    Estimates the count of every edge of `cfg` from the counts of its nodes
+    (a mapping of offsets to counts), keyed by `(start, end)` offsets.
+
+    The flow out of every node (except the exit) and into every node (except
+    offset 0, which is also entered by calls) must add up to the node's
+    count. Edges are solved one at a time from nodes with a single unknown
+    edge, and the flow left at nodes with several unknown out-edges is split
+    in proportion to the counts of their targets. Counts are clamped at 0,
+    since sampled counts don't conserve flow exactly.
+    """
+
+    index = cfg.dense_index()
+    n = len(index)
+    entry = index.positions[0]
+    exit_ = index.positions[-1]
+
+    node_counts = [block_counts.get(offset, 0) for offset in index.offsets]
+
+    # edge ids of the incoming edges of every node, parallel to `pred`
+    in_edges = array('I', [0]) * index.num_edges
+    fill = array('I', index.pred_start[:n])
+    for i in range(n):
+        for e in range(index.succ_start[i], index.succ_start[i+1]):
+            j = index.succ[e]
+            in_edges[fill[j]] = e
+            fill[j] += 1
+
+    def out_edges(i):
+        return range(index.succ_start[i], index.succ_start[i+1])
+
+    def incoming(i):
+        return in_edges[index.pred_start[i]:index.pred_start[i+1]]
+
+    counts = [None] * index.num_edges
+
+    # every constraint is a node and the edges whose counts add up to its
+    # count
+    constraints = [(i, out_edges(i)) for i in range(n) if i != exit_]
+    constraints += [(i, incoming(i)) for i in range(n) if i != entry]
+
+    # which constraints every edge is part of
+    constraints_of = [[] for _ in range(index.num_edges)]
+    for c, (_, edges) in enumerate(constraints):
+        for e in edges:
+            constraints_of[e].append(c)
+
+    worklist = list(range(len(constraints)))
+
+    while worklist:
+        i, edges = constraints[worklist.pop()]
+        unknown = [e for e in edges if counts[e] is None]
+
+        if len(unknown) != 1:
+            continue
+
+        known = sum(counts[e] for e in edges if counts[e] is not None)
+        e = unknown[0]
+        counts[e] = max(0, node_counts[i] - known)
+
+        worklist.extend(constraints_of[e])
+
+    for i in range(n):
+        unknown = [e for e in out_edges(i) if counts[e] is None]
+
+        if not unknown:
+            continue
+
+        known = sum(counts[e] for e in out_edges(i) if counts[e] is not None)
+        remaining = max(0, node_counts[i] - known)
+        weights = [node_counts[index.succ[e]] for e in unknown]
+        total = sum(weights)
+
+        for e, weight in zip(unknown, weights):
+            if total:
+                counts[e] = remaining * weight / total
+            else:
+                counts[e] = remaining / len(unknown)
+
+    return dict(zip(index.edges(), counts))
@@ -0,0 +1,418 @@
+"""
+A compact binary format for CFGs.
+
+A file starts with a fixed header, followed by packed arrays in native byte
+order, each aligned to 8 bytes:
+
+    offsets       int32[nodes]     in ascending order
+    opcodes       uint16[nodes]    SYNTHETIC | i for the i-th synthetic name
+    args          int32[nodes]     NO_ARG if the instruction has no argument
+    succ_start    uint32[nodes+1]  as in `DenseIndex`
+    succ          uint32[edges]
+    pred_start    uint32[nodes+1]
+    pred          uint32[edges]
+    last_block    int32[nodes]     innermost block of the node's block stack
+    flags         uint8[nodes]     path metadata (HAS_RETURN, HAS_EXCEPT)
+    broken_start  uint32[nodes+1]  the 'broken loops' of node `i` are
+    broken        int32[broken]    broken[broken_start[i]:broken_start[i+1]]
+    creators      uint16[blocks]   opcode of the instruction creating the block
+    next_offsets  int32[blocks]
+    parents       int32[blocks]    -1 for the outermost blocks
+    names         uint8[names]     names of the synthetic nodes (the exit node,
+                                   `EDGE_SPLIT`...), each ending with a NUL
+
+The header also holds the structural fingerprint of the code object (see
+`fingerprint.py`), as `MappedCFG.fingerprint`.
+
+`load` maps a file into memory and reads these arrays in place, so loading
+doesn't create any Python objects per node.
+
+The format doesn't keep the code object, so instructions only have their
+opname, opcode and raw argument: `argval`, `argrepr`, line numbers and
+`is_jump_target` are lost, as is the opcode of synthetic nodes (always 0).
+Path metadata other than 'has return', 'has except' and 'broken loops' is
+dropped.
+"""
+
+import dis
+import mmap
+import struct
+from array import array
+from bisect import bisect_left
+from collections import deque
+
+from .cfg import Block, DenseIndex, synthetic_instruction
+from .fingerprint import fingerprint
+
+
+MAGIC = b'PCFG'
+VERSION = 3
+
+# written in native byte order, so a file from a machine of the other
+# endianness reads as 0x0100
+BYTE_ORDER_MARK = 0x0001
+
+# magic, version, byte order mark, fingerprint, nodes, edges, blocks,
+# broken loops, names
+_header = struct.Struct('=4sHH16sIIIII')
+
+# opcodes of synthetic nodes, whose names are stored in `names`
+SYNTHETIC = 0x8000
+NO_ARG = -1
+
+HAS_RETURN = 1
+HAS_EXCEPT = 2
+
+_sections = (
+    ('offsets', 'i', 'nodes'),
+    ('opcodes', 'H', 'nodes'),
+    ('args', 'i', 'nodes'),
+    ('succ_start', 'I', 'nodes+1'),
+    ('succ', 'I', 'edges'),
+    ('pred_start', 'I', 'nodes+1'),
+    ('pred', 'I', 'edges'),
+    ('last_block', 'i', 'nodes'),
+    ('flags', 'B', 'nodes'),
+    ('broken_start', 'I', 'nodes+1'),
+    ('broken', 'i', 'broken'),
+    ('creators', 'H', 'blocks'),
+    ('next_offsets', 'i', 'blocks'),
+    ('parents', 'i', 'blocks'),
+    ('names', 'B', 'names'),
+)
+
+
+class InvalidCFGFile(Exception):
+    pass
+
+
+def _align(n):
+    return (n + 7) & ~7
+
+
+def _lengths(nodes, edges, blocks, broken, names):
+    return {
+        'nodes': nodes,
+        'nodes+1': nodes + 1,
+        'edges': edges,
+        'blocks': blocks,
+        'broken': broken,
+        'names': names,
+    }
+
+
+def dumps(cfg):
+    """
+    Serializes `cfg` into bytes.
+    """
+
+    index = cfg.dense_index()
+    columns = {name: array(typecode) for name, typecode, _ in _sections}
+
+    columns['offsets'].extend(index.offsets)
+    columns['succ_start'].extend(index.succ_start)
+    columns['succ'].extend(index.succ)
+    columns['pred_start'].extend(index.pred_start)
+    columns['pred'].extend(index.pred)
+
+    block_ids = {}
+    synthetic = {}
+
+    def block_id(block):
+        if block is None:
+            return -1
+
+        if id(block) not in block_ids:
+            parent = block_id(block.parent)
+            block_ids[id(block)] = len(columns['creators'])
+            columns['creators'].append(dis.opmap[block.creator])
+            columns['next_offsets'].append(block.next_offset)
+            columns['parents'].append(parent)
+
+        return block_ids[id(block)]
+
+    columns['broken_start'].append(0)
+
+    for offset in index.offsets:
+        bb = cfg[offset]
+        instr = bb.instruction
+
+        if bb.is_exit or dis.opmap.get(instr.opname) != instr.opcode:
+            opcode = SYNTHETIC | synthetic.setdefault(instr.opname, len(synthetic))
+        else:
+            opcode = instr.opcode
+
+        columns['opcodes'].append(opcode)
+        columns['args'].append(NO_ARG if instr.arg is None else instr.arg)
+
+        view = bb.blockstack_view
+        columns['last_block'].append(block_id(view.last_block if view else None))
+
+        flags = 0
+        if bb.path_metadata.get('has return'):
+            flags |= HAS_RETURN
+        if bb.path_metadata.get('has except'):
+            flags |= HAS_EXCEPT
+        columns['flags'].append(flags)
+
+        for block in bb.path_metadata.get('broken loops', ()):
+            columns['broken'].append(block_id(block))
+        columns['broken_start'].append(len(columns['broken']))
+
+    columns['names'].frombytes(b''.join(name.encode() + b'\0'
+                                        for name in synthetic))
+
+    chunks = [_header.pack(MAGIC, VERSION, BYTE_ORDER_MARK,
+                           fingerprint(cfg.code), len(index),
+                           index.num_edges, len(columns['creators']),
+                           len(columns['broken']), len(columns['names']))]
+    chunks.append(bytes(_align(_header.size) - _header.size))
+
+    for name, _, _ in _sections:
+        data = columns[name].tobytes()
+        chunks.append(data)
+        chunks.append(bytes(_align(len(data)) - len(data)))
+
+    return b''.join(chunks)
+
+
+def dump(cfg, f):
+    """
+    Writes `cfg` to the binary file object `f`.
+    """
+
+    f.write(dumps(cfg))
+
+
+def loads(data):
+    """
+    Returns a read-only `MappedCFG` over the buffer `data`, without copying
+    it.
+    """
+
+    return MappedCFG(data)
+
+
+def load(path):
+    """
+    Maps the file at `path` into memory and returns a read-only `MappedCFG`
+    over it. Processes loading the same file share its pages.
+    """
+
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    return MappedCFG(mapped)
+
+
+class MappedBlock:
+    """
+    A node of a `MappedCFG`, created on demand. It mirrors the parts of
+    `BasicBlock` which don't need the code object.
+    """
+
+    __slots__ = ('_cfg', '_i', 'offset')
+
+    def __init__(self, cfg, i):
+        self._cfg = cfg
+        self._i = i
+        self.offset = cfg.offsets[i]
+
+    @property
+    def is_exit(self):
+        return self.offset == -1
+
+    @property
+    def opcode(self):
+        # synthetic nodes, like the exit node, have opcode 0 in `CFG` too
+        opcode = self._cfg.opcodes[self._i]
+        return 0 if opcode & SYNTHETIC else opcode
+
+    @property
+    def opname(self):
+        opcode = self._cfg.opcodes[self._i]
+
+        if opcode & SYNTHETIC:
+            return self._cfg.synthetic_names[opcode & ~SYNTHETIC]
+        return dis.opname[opcode]
+
+    @property
+    def arg(self):
+        arg = self._cfg.args[self._i]
+        return None if arg == NO_ARG else arg
+
+    @property
+    def instruction(self):
+        return synthetic_instruction(self.opname, self.offset, self.opcode,
+                                     self.arg)
+
+    @property
+    def successors(self):
+        cfg = self._cfg
+        return [cfg.offsets[j] for j in
+                cfg.succ[cfg.succ_start[self._i]:cfg.succ_start[self._i+1]]]
+
+    @property
+    def path_metadata(self):
+        flags = self._cfg.flags[self._i]
+        metadata = {}
+
+        if flags & HAS_RETURN:
+            metadata['has return'] = True
+        if flags & HAS_EXCEPT:
+            metadata['has except'] = True
+
+        cfg = self._cfg
+        broken = cfg.broken[cfg.broken_start[self._i]:cfg.broken_start[self._i+1]]
+        if len(broken):
+            metadata['broken loops'] = [cfg.block(b) for b in broken]
+
+        return metadata
+
+    def blocks(self):
+        """
+        Yields the blocks on the block stack of this node as
+        `(creator, next_offset)` pairs, innermost first.
+        """
+
+        cfg = self._cfg
+        block = cfg.last_block[self._i]
+
+        while block != -1:
+            yield dis.opname[cfg.creators[block]], cfg.next_offsets[block]
+            block = cfg.parents[block]
+
+    def __str__(self):
+        return "{}:{} [{}]".format(self.opname, self.offset, self.arg)
+
+    __repr__ = __str__
+
+
+class MappedCFG:
+    """
+    A read-only CFG backed by a buffer in the format written by `dumps`.
+    """
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        self._view = view = memoryview(buffer)
+
+        if len(view) < _header.size:
+            raise InvalidCFGFile("File is too short to be a CFG")
+
+        magic, version, mark, fp, nodes, edges, blocks, broken, names = \
+            _header.unpack_from(view, 0)
+
+        if magic != MAGIC:
+            raise InvalidCFGFile("Not a CFG file")
+        if version != VERSION:
+            raise InvalidCFGFile("Unsupported CFG file version: %d" % version)
+        if mark != BYTE_ORDER_MARK:
+            raise InvalidCFGFile("CFG file was written with another byte order")
+
+        self.fingerprint = fp
+
+        lengths = _lengths(nodes, edges, blocks, broken, names)
+        position = _align(_header.size)
+
+        for name, typecode, length in _sections:
+            size = lengths[length] * struct.calcsize(typecode)
+
+            if position + size > len(view):
+                raise InvalidCFGFile("CFG file is truncated")
+
+            setattr(self, name, view[position:position+size].cast(typecode))
+            position += _align(size)
+
+        self.synthetic_names = bytes(self.names).decode().split('\0')[:-1]
+
+        self.__dense_index = None
+
+    def close(self):
+        """
+        Releases the views of the buffer, and closes it if it's a mapped file.
+        """
+
+        self.__dense_index = None
+
+        for name, _, _ in _sections:
+            getattr(self, name).release()
+        self._view.release()
+
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def _position(self, offset):
+        i = bisect_left(self.offsets, offset)
+
+        if i == len(self.offsets) or self.offsets[i] != offset:
+            raise KeyError(offset)
+
+        return i
+
+    def __getitem__(self, offset):
+        return MappedBlock(self, self._position(offset))
+
+    def block(self, b):
+        """
+        Returns block number `b` as a `Block` equal to the one it was written
+        from, or None if `b` is -1.
+        """
+
+        if b == -1:
+            return None
+
+        return Block(dis.opname[self.creators[b]], self.next_offsets[b],
+                     self.block(self.parents[b]))
+
+    def __contains__(self, offset):
+        try:
+            self._position(offset)
+        except KeyError:
+            return False
+
+        return True
+
+    def successors(self, offset):
+        return self[offset].successors
+
+    def __iter__(self):
+        """
+        Iterates over the nodes using BFS, like `CFG.__iter__`.
+        """
+
+        start = self._position(0)
+        queued = bytearray(len(self))
+        queued[start] = 1
+        to_visit = deque([start])
+
+        while to_visit:
+            i = to_visit.popleft()
+
+            for j in self.succ[self.succ_start[i]:self.succ_start[i+1]]:
+                if not queued[j]:
+                    queued[j] = 1
+                    to_visit.append(j)
+
+            yield MappedBlock(self, i)
+
+    def dense_index(self):
+        """
+        Returns a `DenseIndex` whose arrays are views of the buffer.
+        """
+
+        if self.__dense_index is None:
+            self.__dense_index = DenseIndex.from_arrays(
+                self.offsets, self.succ_start, self.succ, self.pred_start,
+                self.pred)
+
+        return self.__dense_index
@@ -0,0 +1,350 @@
+"""
+A local daemon which builds CFGs for many processes and shares them through
+one cache.
+
+Run it with `python -m pycfg.server`. It listens on a Unix domain socket and
+speaks in frames, each a 4-byte big-endian length followed by a payload. A
+request is a marshalled list of marshalled code objects, and the response is
+a marshalled list with a `(True, cfg)` pair for every code object which was
+built, where `cfg` is in the format of `pycfg.serialize`, or a
+`(False, error)` pair for every code object which wasn't.
+
+The socket is only accessible to the user running the server, since
+requests are unmarshalled. By default it's in `$XDG_RUNTIME_DIR`, or else in
+a directory of the temporary directory which only that user can access.
+"""
+
+import argparse
+import hashlib
+import marshal
+import os
+import socket
+import socketserver
+import stat
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+
+from . import serialize
+from .cfg import CFG
+
+
+_length = struct.Struct('!I')
+
+
+class ServerError(Exception):
+    pass
+
+
+def default_socket_path(create=False):
+    """
+    Returns the default path of the server's socket. If `create` is true, the
+    private directory holding it is created when it doesn't exist yet.
+
+    Raises `ServerError` if that directory isn't private to the current user.
+    """
+
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+
+    if runtime_dir:
+        return os.path.join(runtime_dir, 'pycfg.sock')
+
+    directory = os.path.join(tempfile.gettempdir(), 'pycfg-%d' % os.getuid())
+
+    if create:
+        try:
+            os.mkdir(directory, 0o700)
+        except FileExistsError:
+            pass
+
+    try:
+        st = os.lstat(directory)
+    except FileNotFoundError:
+        # there's no server, and the client falls back to building CFGs
+        return os.path.join(directory, 'pycfg.sock')
+
+    if (not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or
+            st.st_mode & 0o077):
+        raise ServerError("%s isn't a directory private to this user" % directory)
+
+    return os.path.join(directory, 'pycfg.sock')
+
+
+def _remove_stale_socket(path):
+    """
+    Removes the socket at `path` if no server is listening on it anymore.
+    Raises `ServerError` if something else is at `path`, or if a server is
+    still listening.
+    """
+
+    try:
+        st = os.lstat(path)
+    except FileNotFoundError:
+        return
+
+    if not stat.S_ISSOCK(st.st_mode):
+        raise ServerError("%s exists and isn't a socket" % path)
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+    try:
+        sock.connect(path)
+    except OSError:
+        os.unlink(path)
+    else:
+        raise ServerError("A server is already listening on %s" % path)
+    finally:
+        sock.close()
+
+
+def _send_frame(sock, payload):
+    sock.sendall(_length.pack(len(payload)) + payload)
+
+
+def _recv_exactly(sock, n):
+    chunks = []
+
+    while n:
+        chunk = sock.recv(min(n, 1 << 20))
+
+        if not chunk:
+            raise EOFError("Connection closed")
+
+        chunks.append(chunk)
+        n -= len(chunk)
+
+    return b''.join(chunks)
+
+
+def _recv_frame(sock):
+    n, = _length.unpack(_recv_exactly(sock, _length.size))
+    return _recv_exactly(sock, n)
+
+
+class LRUCache:
+    """
+    A thread-safe mapping which holds at most `maxsize` entries, evicting the
+    least recently used one first.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def build(marshalled_code):
+    """
+    Builds the CFG of a marshalled code object, returning it serialized.
+    """
+
+    return serialize.dumps(CFG(marshal.loads(marshalled_code)))
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                request = _recv_frame(self.request)
+            except EOFError:
+                return
+
+            response = []
+
+            try:
+                batch = marshal.loads(request)
+            except (EOFError, ValueError, TypeError) as e:
+                batch = []
+                response.append((False, "Invalid request: %s" % e))
+
+            for marshalled_code in batch:
+                response.append(self.server.lookup(marshalled_code))
+
+            _send_frame(self.request, marshal.dumps(response))
+
+
+class CFGServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path=None, cache_size=4096):
+        if path is None:
+            path = default_socket_path(create=True)
+
+        self.path = path
+        self.cache = LRUCache(cache_size)
+
+        _remove_stale_socket(path)
+
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(path, _Handler)
+        finally:
+            os.umask(old_umask)
+
+        st = os.lstat(path)
+        self._socket_id = (st.st_dev, st.st_ino)
+
+    def lookup(self, marshalled_code):
+        key = hashlib.sha1(marshalled_code).digest()
+        data = self.cache.get(key)
+
+        if data is None:
+            try:
+                data = build(marshalled_code)
+            except Exception as e:
+                return (False, "%s: %s" % (type(e).__name__, e))
+
+            self.cache.put(key, data)
+
+        return (True, data)
+
+    def server_close(self):
+        super().server_close()
+
+        # only remove the socket if it's still ours
+        try:
+            st = os.lstat(self.path)
+        except FileNotFoundError:
+            return
+
+        if (st.st_dev, st.st_ino) == self._socket_id:
+            os.unlink(self.path)
+
+
+class Client:
+    """
+    Gets CFGs from a `CFGServer`, or builds them in-process if the server
+    can't be reached or fails to build one. Either way, the CFGs are
+    `pycfg.serialize.MappedCFG`s.
+    """
+
+    def __init__(self, path=None, timeout=10.0):
+        self.path = default_socket_path() if path is None else path
+        self.timeout = timeout
+
+        self._sock = None
+
+    def _connect(self):
+        if self._sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+
+            try:
+                sock.connect(self.path)
+            except OSError:
+                sock.close()
+                raise
+
+            self._sock = sock
+
+        return self._sock
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def request(self, codes):
+        """
+        Sends one batch of code objects to the server, and returns its list of
+        `(ok, cfg or error)` pairs. Raises `OSError` or `EOFError` if the
+        server can't be reached.
+        """
+
+        sock = self._connect()
+
+        try:
+            _send_frame(sock, marshal.dumps([marshal.dumps(c) for c in codes]))
+            response = marshal.loads(_recv_frame(sock))
+        except (OSError, EOFError):
+            self.close()
+            raise
+
+        if len(response) != len(codes):
+            raise ServerError(response[0][1] if response else "Empty response")
+
+        return response
+
+    def get_many(self, codes):
+        codes = list(codes)
+
+        try:
+            response = self.request(codes)
+        except (OSError, EOFError, ServerError):
+            response = [(False, None)] * len(codes)
+
+        cfgs = []
+
+        for code, (ok, data) in zip(codes, response):
+            if not ok:
+                # this raises the same error the server ran into
+                data = serialize.dumps(CFG(code))
+
+            cfgs.append(serialize.loads(data))
+
+        return cfgs
+
+    def get(self, code):
+        return self.get_many([code])[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m pycfg.server',
+        description="Build CFGs for local processes, sharing one cache.")
+    parser.add_argument('--socket',
+                        help="path of the Unix domain socket to listen on "
+                             "(default: $XDG_RUNTIME_DIR/pycfg.sock)")
+    parser.add_argument('--cache-size', type=int, default=4096,
+                        help="number of CFGs to keep in memory")
+    args = parser.parse_args(argv)
+
+    try:
+        server = CFGServer(args.socket, args.cache_size)
+    except ServerError as e:
+        parser.exit(1, "error: {}\n".format(e))
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Transforms which return a new CFG and leave the original one untouched.
+"""
+
+from .cfg import CFG, BasicBlock, synthetic_instruction
+
+
+def critical_edges(cfg):
+    """
+    Returns the critical edges of `cfg`, the edges whose source has more than
+    one successor and whose target has more than one predecessor, as
+    `(start, end)` offset pairs in edge id order.
+
+    This is stricter than `cfg.is_critical(edge)`, which only looks at the
+    target: code for an edge whose source has a single successor can go at
+    the end of its source, so the edge doesn't need to be split.
+    """
+
+    index = cfg.dense_index()
+    edges = []
+
+    for i, offset in enumerate(index.offsets):
+        if index.succ_start[i+1] - index.succ_start[i] < 2:
+            # code for the edge can go at the end of its source
+            continue
+
+        for e in range(index.succ_start[i], index.succ_start[i+1]):
+            j = index.succ[e]
+
+            if index.pred_start[j+1] - index.pred_start[j] > 1:
+                edges.append((offset, index.offsets[j]))
+
+    return edges
+
+
+def split_critical_edges(cfg):
+    """
+    Returns `(split_cfg, original_edges)`, where `split_cfg` is a copy of
+    `cfg` in which every critical edge goes through a new `EDGE_SPLIT` node,
+    and `original_edges` maps the offset of each of those nodes to the edge of
+    `cfg` it was inserted on.
+
+    The split nodes get negative offsets, starting at -2 (the exit node is
+    -1), and they inherit the block stack and path metadata of the start of
+    their edge, since they are executed right after it.
+    """
+
+    basic_blocks = {
+        offset: BasicBlock(bb.instruction, bb.blockstack_view,
+                           list(bb.successors), dict(bb.path_metadata))
+        for offset, bb in cfg.basic_blocks.items()
+    }
+
+    original_edges = {}
+    split_offset = -2
+
+    for start, end in critical_edges(cfg):
+        bb = basic_blocks[start]
+
+        instr = synthetic_instruction('EDGE_SPLIT', split_offset)
+        basic_blocks[split_offset] = BasicBlock(instr, bb.blockstack_view, [end],
+                                                dict(bb.path_metadata))
+
+        bb.successors = [split_offset if succ == end else succ
+                         for succ in bb.successors]
+
+        original_edges[split_offset] = (start, end)
+        split_offset -= 1
+
+    split_cfg = CFG.from_basic_blocks(cfg.code, basic_blocks, cfg._blockstack)
+
+    return split_cfg, original_edges
@@ -0,0 +1,58 @@
+import unittest
+
+from pycfg.callgraph import ProgramGraph
+
+
+source = '''
+def top(x):
+    def helper(y):
+        return y + x
+    sq = lambda v: v * v
+    ys = list(helper(i) for i in range(x))
+    return sq(helper(x)), ys
+
+def other():
+    return top(3)
+
+def keywords(o):
+    return top(x=3) + top(*[3]) + o.top(3)
+
+def rebound():
+    f = lambda: 1
+    f = len
+    return f()
+'''
+
+
+class TestProgramGraph(unittest.TestCase):
+    def setUp(self):
+        self.graph = ProgramGraph(compile(source, 'm', 'exec'))
+        self.codes = {m.qualname[len('<module>.'):]: m.code for m in self.graph}
+
+    def test_members(self):
+        names = [m.qualname for m in self.graph]
+
+        assert names[:3] == ['<module>', '<module>.top', '<module>.top.helper']
+        assert len(self.graph) == 9
+        assert not any(m.has_cfg for m in self.graph)
+
+        self.graph.cfg(self.codes['top'])
+        assert [m.code.co_name for m in self.graph if m.has_cfg] == ['top']
+
+    def test_definitions(self):
+        defined = {d.code.co_name for d in self.graph.definitions(self.codes['top'])}
+
+        assert defined == {'helper', '<lambda>', '<genexpr>'}
+
+    def test_call_edges(self):
+        c = self.codes
+
+        assert set(self.graph.callees(c['top'])) == \
+            {c['top.helper'], c['top.<lambda>'], c['top.<genexpr>']}
+        assert self.graph.callees(c['top.<genexpr>']) == [c['top.helper']]
+        assert self.graph.callees(c['other']) == [c['top']]
+        assert self.graph.callees(c['keywords']) == [c['top'], c['top']]
+
+        # range() isn't defined in the program, and `f` is bound twice
+        assert None in {s.callee for s in self.graph.call_sites(c['top'])}
+        assert self.graph.callees(c['rebound']) == []
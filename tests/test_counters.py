@@ -0,0 +1,131 @@
+import os
+import tempfile
+import unittest
+
+import pycfg
+from pycfg import counters, serialize
+from pycfg.counters import CounterFile, InvalidCounterFile, main, merge
+from pycfg.fingerprint import fingerprint
+
+
+def f(x):
+    for i in range(x):
+        if i % 2:
+            x += 1
+    return x
+
+
+def g(x):
+    while x:
+        x -= 1
+    return x
+
+
+class TestCounters(unittest.TestCase):
+    def setUp(self):
+        self.cfg = pycfg.CFG(f.__code__)
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.dir.name, name)
+
+    def write(self, name, increments, cfg=None, kind='edge'):
+        with CounterFile.create(self.path(name), cfg or self.cfg, kind) as counters:
+            for i, n in increments:
+                counters.increment(i, n)
+
+        return self.path(name)
+
+    def test_increment(self):
+        edges = list(self.cfg.dense_index().edges())
+        path = self.write('a.cnt', [(0, 1), (3, 2), (3, 1)])
+
+        with CounterFile.open(path) as counters:
+            assert len(counters) == self.cfg.dense_index().num_edges
+            assert counters.matches(self.cfg)
+
+            counts = counters.edge_counts(self.cfg)
+            assert counts[edges[0]] == 1
+            assert counts[edges[3]] == 3
+            assert sum(counts.values()) == 4
+
+            with self.assertRaises(InvalidCounterFile):
+                counters.path_counts(self.cfg)
+
+    def test_paths(self):
+        path = self.write('p.cnt', [(1, 5)], kind='path')
+
+        with CounterFile.open(path) as counters:
+            assert counters.path_counts(self.cfg) == {1: 5}
+
+    def test_merge(self):
+        a = self.write('a.cnt', [(0, 1), (2, 4)])
+        b = self.write('b.cnt', [(0, 2), (1, 1)])
+
+        main([self.path('merged.cnt'), a, b])
+
+        with CounterFile.open(self.path('merged.cnt')) as merged:
+            assert list(merged.counts[:3]) == [3, 1, 4]
+
+        assert list(merge([a, b], cfg=self.cfg)[:3]) == [3, 1, 4]
+
+    def test_merge_overflow(self):
+        a = self.write('a.cnt', [(0, 1), (2, 2 ** 64 - 1)])
+        b = self.write('b.cnt', [(2, 1)])
+
+        with self.assertRaisesRegex(OverflowError, 'counter 2 '):
+            merge([a, b])
+
+        c = self.write('c.cnt', [(2, 2 ** 64 - 2)])
+        assert merge([b, c])[2] == 2 ** 64 - 1
+
+    def test_mapped_cfg(self):
+        mapped = serialize.loads(serialize.dumps(self.cfg))
+        assert mapped.fingerprint == fingerprint(f.__code__)
+
+        path = self.write('a.cnt', [(1, 2)], cfg=mapped)
+
+        with CounterFile.open(path) as counters:
+            assert counters.matches(self.cfg)
+            assert counters.edge_counts(mapped) == counters.edge_counts(self.cfg)
+
+        mapped.close()
+
+    def test_too_many_counters(self):
+        old = counters.MAX_COUNTERS
+        counters.MAX_COUNTERS = 1
+
+        try:
+            with self.assertRaises(ValueError):
+                self.write('p.cnt', [], kind='path')
+        finally:
+            counters.MAX_COUNTERS = old
+
+        path = self.write('a.cnt', [])
+        counters.MAX_COUNTERS = 1
+
+        try:
+            with self.assertRaises(InvalidCounterFile):
+                CounterFile.open(path)
+        finally:
+            counters.MAX_COUNTERS = old
+
+    def test_mismatch(self):
+        a = self.write('a.cnt', [])
+        b = self.write('b.cnt', [], cfg=pycfg.CFG(g.__code__))
+
+        with self.assertRaises(InvalidCounterFile):
+            merge([a, b])
+
+        with self.assertRaises(InvalidCounterFile):
+            merge([b], cfg=self.cfg)
+
+    def test_invalid(self):
+        with open(self.path('bad.cnt'), 'wb') as f:
+            f.write(b'x' * 64)
+
+        with self.assertRaises(InvalidCounterFile):
+            CounterFile.open(self.path('bad.cnt'))
@@ -0,0 +1,66 @@
+import unittest
+
+import pycfg
+from pycfg.dataflow import (Definition, Liveness, ReachingDefinitions,
+                            dead_stores)
+
+from .utils import line_start, offsets_of
+
+
+def f(x):
+    y = 1
+    y = 2
+    if x:
+        z = y
+    else:
+        z = 0
+    for i in range(x):
+        z += i
+    return z
+
+
+class TestLiveness(unittest.TestCase):
+    def setUp(self):
+        self.cfg = pycfg.CFG(f.__code__)
+        self.liveness = Liveness(self.cfg)
+        self.stores = offsets_of(f, 'STORE_FAST')
+
+    def test_live(self):
+        y_2, z_if, z_else, _, z_loop = self.stores[1:]
+        for_iter, = offsets_of(f, 'FOR_ITER')
+
+        assert self.liveness.live_before(0) == {'x'}
+        assert self.liveness.live_after(y_2) == {'x', 'y'}
+        assert self.liveness.live_after(z_else) == {'x', 'z'}
+
+        # z is live around the loop
+        assert self.liveness.live_before(for_iter) == {'z'}
+        assert not self.liveness.is_live_after(z_loop, 'i')
+
+    def test_dead_stores(self):
+        assert dead_stores(self.cfg, self.liveness) == [self.stores[0]]
+
+
+class TestReachingDefinitions(unittest.TestCase):
+    def setUp(self):
+        self.cfg = pycfg.CFG(f.__code__)
+        self.rd = ReachingDefinitions(self.cfg)
+        self.stores = offsets_of(f, 'STORE_FAST')
+
+    def test_arguments(self):
+        load_x = offsets_of(f, 'LOAD_FAST')[0]
+
+        assert self.rd.definitions_of(load_x) == [Definition(None, 'x')]
+
+    def test_reaching(self):
+        y_1, y_2, z_if, z_else, _, z_loop = self.stores
+        load_y = offsets_of(f, 'LOAD_FAST')[1]
+
+        assert self.rd.definitions_of(load_y) == [Definition(y_2, 'y')]
+
+        # the value of z in the loop comes from either branch or the loop
+        loop_body = line_start(f, 8)
+        assert {d for d in self.rd.definitions_of(loop_body) if d.name == 'z'} == {
+            Definition(z_if, 'z'), Definition(z_else, 'z'), Definition(z_loop, 'z')}
+
+        assert Definition(y_1, 'y') not in self.rd.reaching(line_start(f, 9))
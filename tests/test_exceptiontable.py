@@ -0,0 +1,52 @@
+import dis
+import unittest
+
+import pycfg
+from pycfg.cfg import USE_EXCEPTION_TABLE
+from pycfg.exceptiontable import ExceptionTable, parse_exception_table
+
+from .test_cfg import function_registry
+
+
+def f(x):
+    try:
+        x = x + 1
+    except ValueError:
+        return -1
+    return x
+
+
+@unittest.skipUnless(USE_EXCEPTION_TABLE, "needs an interpreter with exception tables")
+class TestExceptionTable(unittest.TestCase):
+    def test_parse(self):
+        for func in function_registry + [f]:
+            expected = sorted((e.start, e.end, e.target, e.depth, e.lasti)
+                              for e in dis.Bytecode(func).exception_entries)
+
+            assert [tuple(e) for e in parse_exception_table(func.__code__)] == expected
+
+    def test_handler_of(self):
+        table = ExceptionTable(f.__code__)
+
+        for entry in table.entries:
+            assert table.handler_of(entry.start) == entry
+            assert table.handler_of(entry.end - 2) == entry
+
+        assert table.handler_of(0) is None
+        assert table.handler_of(len(f.__code__.co_code)) is None
+
+    def test_handler_edges(self):
+        cfg = pycfg.CFG(f.__code__)
+        table = ExceptionTable(f.__code__)
+
+        add = next(bb for bb in cfg.basic_blocks.values()
+                   if bb.instruction.opname in ('BINARY_OP', 'BINARY_ADD'))
+        handler = table.handler_of(add.offset).target
+
+        assert handler in add.successors
+        assert handler in cfg
+        assert -1 in cfg.reachability().reachable_from(handler)
+
+        for bb in cfg:
+            for succ in bb.successors:
+                assert succ in cfg
@@ -0,0 +1,66 @@
+import unittest
+
+import pycfg
+from pycfg.fingerprint import CFGCorpus, fingerprint
+
+
+def f(x):
+    for i in range(x):
+        if i > 3:
+            break
+    return 1
+
+
+def g(y):
+    for j in range(y):
+        if j > 7:
+            break
+    return 2
+
+
+def h(x):
+    while x:
+        x -= 1
+    return x
+
+
+class TestFingerprint(unittest.TestCase):
+    def test_ignores_names_and_constants(self):
+        assert fingerprint(f.__code__) == fingerprint(g.__code__)
+
+    def test_structure(self):
+        assert fingerprint(f.__code__) != fingerprint(h.__code__)
+
+
+class TestCFGCorpus(unittest.TestCase):
+    def test_views(self):
+        corpus = CFGCorpus()
+
+        view_f = corpus.add(f.__code__)
+        view_g = corpus.add(g.__code__)
+        view_h = corpus.add(h.__code__)
+
+        assert view_f.canonical is view_g.canonical
+        assert view_f.canonical is not view_h.canonical
+
+        expected = pycfg.CFG(g.__code__)
+
+        for bb in view_g:
+            assert bb.instruction == expected[bb.offset].instruction
+            assert bb.successors == expected[bb.offset].successors
+
+        assert view_g.dense_index() is view_f.dense_index()
+
+    def test_view_members_use_own_instructions(self):
+        corpus = CFGCorpus()
+        corpus.add(f.__code__)
+        view = corpus.add(g.__code__)
+
+        expected = pycfg.CFG(g.__code__)
+
+        for offset, bb in view.basic_blocks.items():
+            assert bb.instruction.argval == \
+                expected.basic_blocks[offset].instruction.argval
+
+        assert 7 in [bb.instruction.argval for bb in view.filter()]
+        assert view.to_dot() == expected.to_dot()
@@ -0,0 +1,156 @@
+import dis
+import unittest
+from collections import Counter
+
+import pycfg
+from pycfg.hotpaths import BallLarus, hottest_paths, superblocks
+
+from .utils import offsets_of
+
+
+def branchy(x):
+    for i in range(x):
+        if i % 2:
+            x += 1
+        else:
+            x -= 1
+    return x
+
+
+def sequential_ifs(n):
+    """
+    Returns a function made of `n` sequential `if`s, which has 2 ** n paths.
+    """
+
+    lines = ['def f(x):']
+    for i in range(n):
+        lines.append('    if x & {}:'.format(1 << i))
+        lines.append('        x += 1')
+    lines.append('    return x')
+
+    namespace = {}
+    exec('\n'.join(lines), namespace)
+    return namespace['f']
+
+
+def path_edges(path):
+    return list(zip(path.offsets, path.offsets[1:]))
+
+
+class TestHotPaths(unittest.TestCase):
+    def setUp(self):
+        self.cfg = pycfg.CFG(branchy.__code__)
+        self.ball_larus = BallLarus(self.cfg)
+
+    def test_path_ids(self):
+        bl = self.ball_larus
+        edge_values = bl.edge_values()
+        back_edge_values = bl.back_edge_values()
+        paths = [bl.path(i) for i in range(bl.num_paths)]
+
+        assert len(set(paths)) == bl.num_paths
+
+        for path_id, path in enumerate(paths):
+            value = sum(edge_values[e] for e in path_edges(path))
+
+            if path.from_loop_header:
+                value += back_edge_values[next(e for e in back_edge_values
+                                               if e[1] == path.offsets[0])][1]
+            if path.to_back_edge:
+                value += back_edge_values[next(e for e in back_edge_values
+                                               if e[0] == path.offsets[-1])][0]
+
+            assert value == path_id, (path_id, path)
+
+    def test_hottest_from_path_counts(self):
+        counts = {i: i for i in range(self.ball_larus.num_paths)}
+        hot = hottest_paths(self.cfg, path_counts=counts, k=2)
+
+        assert [h.count for h in hot] == [self.ball_larus.num_paths - 1,
+                                          self.ball_larus.num_paths - 2]
+        assert hot[0].path == self.ball_larus.path(hot[0].count)
+
+    def walk(self, start, choices):
+        """
+        Returns the nodes visited from `start` (included) until the loop
+        header or the exit is reached again, taking `choices[offset]` at
+        every branch.
+        """
+
+        offsets = [start]
+
+        while True:
+            successors = set(self.cfg[offsets[-1]].successors)
+            succ, = successors if len(successors) == 1 else [choices[offsets[-1]]]
+
+            if succ in (self.header, -1):
+                return offsets + [succ]
+
+            offsets.append(succ)
+
+    def profile(self):
+        """
+        Returns the edge counts of a run where the loop runs 10 times and
+        takes the odd branch 9 times, and the nodes of an odd iteration.
+        """
+
+        self.header, = offsets_of(branchy, 'FOR_ITER')
+        exit_target = self.cfg[self.header].instruction.argval
+
+        instructions = list(dis.get_instructions(branchy))
+        loop = self.cfg.loop_forest().loop_of(self.header)
+        branch = next(offset for offset in sorted(loop.offsets())
+                      if offset != self.header and
+                      len(set(self.cfg[offset].successors)) == 2)
+
+        # the branch jumps to the else clause
+        odd = next(instr.offset for instr in instructions if instr.offset > branch)
+        even = self.cfg[branch].instruction.argval
+
+        body = self.cfg[self.header].successors
+        into_body = next(s for s in body if s != exit_target)
+
+        counts = Counter()
+
+        def count(offsets, n):
+            for edge in zip(offsets, offsets[1:]):
+                counts[edge] += n
+
+        count(self.walk(0, {}), 1)
+
+        odd_iteration = self.walk(self.header, {self.header: into_body, branch: odd})
+        count(odd_iteration, 9)
+        count(self.walk(self.header, {self.header: into_body, branch: even}), 1)
+        count(self.walk(self.header, {self.header: exit_target}), 1)
+
+        return counts, odd_iteration[:-1]
+
+    def test_hottest_from_edge_counts(self):
+        counts, odd_iteration = self.profile()
+        hot = hottest_paths(self.cfg, edge_counts=counts, k=3)
+
+        assert [h.count for h in hot] == [9, 1, 1]
+        assert list(hot[0].path.offsets) == odd_iteration
+        assert hot[0].path.from_loop_header and hot[0].path.to_back_edge
+
+    def test_hottest_with_tied_counts(self):
+        # every path has the same count, which mustn't make the search
+        # extend all the 2 ** 30 partial paths
+        cfg = pycfg.CFG(sequential_ifs(30).__code__)
+        counts = dict.fromkeys(cfg.dense_index().edges(), 1)
+
+        hot = hottest_paths(cfg, edge_counts=counts, k=3)
+
+        assert [h.count for h in hot] == [1, 1, 1]
+        assert len({h.path.offsets for h in hot}) == 3
+        assert all(h.path.offsets[-1] == -1 for h in hot)
+
+    def test_superblocks(self):
+        counts, odd_iteration = self.profile()
+        traces = superblocks(self.cfg, counts)
+        offsets = [o for t in traces for o in t.offsets]
+
+        assert len(offsets) == len(set(offsets))
+        assert list(traces[0].offsets) == odd_iteration
+        assert traces[0].count == 11
+        assert traces[0].side_entrances == ()
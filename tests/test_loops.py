@@ -0,0 +1,59 @@
+import unittest
+
+import pycfg
+
+from .utils import last_offset, offsets_of
+
+
+def nested(x):
+    for i in range(x):
+        while i:
+            i -= 1
+            if i == 3:
+                break
+    return 1
+
+
+def straight(x):
+    return x + 1
+
+
+class TestLoopForest(unittest.TestCase):
+    def test_nested_loops(self):
+        cfg = pycfg.CFG(nested.__code__)
+        forest = cfg.loop_forest()
+
+        assert forest is cfg.loop_forest()
+        assert len(forest) == 2
+        assert len(forest.roots) == 1
+
+        outer = forest.roots[0]
+        inner, = outer.children
+
+        for_iter, = offsets_of(nested, 'FOR_ITER')
+        store_for, store_while = offsets_of(nested, 'STORE_FAST')
+
+        assert outer.header == for_iter
+        assert inner.parent is outer
+        assert (outer.depth, inner.depth) == (1, 2)
+        assert set(inner.offsets()) < set(outer.offsets())
+
+        back_edges = forest.back_edges()
+        assert {end for _, end in back_edges} == {outer.header, inner.header}
+        assert all(start in forest.loop_of(end) for start, end in back_edges)
+
+        exit_target = cfg[for_iter].instruction.argval
+        assert (for_iter, exit_target) in outer.exits
+
+        assert forest.loop_of(store_while) is inner
+        assert forest.loop_of(store_for) is outer
+        assert forest.depth(store_while) == 2
+        assert forest.depth(last_offset(nested)) == 0
+        assert store_while in inner and store_for not in inner
+
+    def test_no_loops(self):
+        cfg = pycfg.CFG(straight.__code__)
+        forest = cfg.loop_forest()
+
+        assert len(forest) == 0
+        assert forest.loop_of(0) is None
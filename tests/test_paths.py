@@ -0,0 +1,68 @@
+import unittest
+
+import pycfg
+from pycfg.paths import acyclic_paths, count_paths
+
+from .test_cfg import function_registry
+from .utils import line_start
+
+
+def branchy(x):
+    if x % 2:
+        x += 1
+    else:
+        x -= 1
+    for i in range(x):
+        print(i)
+    if x:
+        return 1
+    return 2
+
+
+def edges_of(path):
+    return set(zip(path, path[1:]))
+
+
+class TestPaths(unittest.TestCase):
+    def test_count_matches_enumeration(self):
+        for func in function_registry + [branchy]:
+            cfg = pycfg.CFG(func.__code__)
+            paths = list(acyclic_paths(cfg))
+
+            assert len(paths) == len(set(paths)) == count_paths(cfg)
+
+            for path in paths:
+                assert path[0] == 0 and path[-1] == -1
+                assert len(path) == len(set(path))
+
+                for start, end in edges_of(path):
+                    assert end in cfg[start].successors
+
+    def test_branchy(self):
+        cfg = pycfg.CFG(branchy.__code__)
+        paths = list(acyclic_paths(cfg))
+
+        # either of the two branches, and then either of the two returns,
+        # since the loop body always ends with a retreating edge
+        assert len(paths) == 4
+        assert not any(line_start(branchy, 6) in p for p in paths)
+
+    def test_pruning(self):
+        cfg = pycfg.CFG(branchy.__code__)
+        paths = list(acyclic_paths(cfg))
+
+        shortest = min(map(len, paths))
+        assert list(acyclic_paths(cfg, max_length=shortest)) == \
+            [p for p in paths if len(p) == shortest]
+
+        odd = line_start(branchy, 2)
+        even = line_start(branchy, 4)
+
+        through = [p for p in paths if even in p]
+        assert list(acyclic_paths(cfg, must_pass=[even])) == through
+        assert count_paths(cfg, must_pass=[even]) == len(through) == 2
+        assert count_paths(cfg, must_pass=[even, odd]) == 0
+
+        covered = edges_of(paths[0]) | edges_of(paths[1])
+        uncovered = list(acyclic_paths(cfg, covered_edges=covered))
+        assert uncovered == [p for p in paths if not edges_of(p) <= covered]
@@ -0,0 +1,61 @@
+import unittest
+
+import pycfg
+
+from .test_cfg import function_registry
+from .utils import offsets_of
+
+
+def f(x):
+    for i in range(x):
+        print(i)
+        if i > 3:
+            break
+    return 1
+
+
+def walk(cfg, start):
+    seen = {start}
+    stack = [start]
+
+    while stack:
+        for succ in cfg[stack.pop()].successors:
+            if succ not in seen:
+                seen.add(succ)
+                stack.append(succ)
+
+    return seen
+
+
+class TestReachability(unittest.TestCase):
+    def test_matches_walks(self):
+        for func in function_registry + [f]:
+            cfg = pycfg.CFG(func.__code__)
+            reachability = cfg.reachability()
+
+            for start in cfg.basic_blocks:
+                reached = walk(cfg, start)
+
+                assert set(reachability.reachable_from(start)) == reached
+
+                for end in cfg.basic_blocks:
+                    assert reachability.can_reach(start, end) == (end in reached)
+
+    def test_queries(self):
+        cfg = pycfg.CFG(f.__code__)
+        reachability = cfg.reachability()
+
+        assert reachability is cfg.reachability()
+
+        for_iter, = offsets_of(f, 'FOR_ITER')
+        store, = offsets_of(f, 'STORE_FAST')
+
+        # nodes of the same loop reach each other
+        assert reachability.can_reach(store, for_iter)
+        assert reachability.can_reach(for_iter, store)
+        assert not reachability.can_reach(-1, 0)
+        assert set(reachability.reaching_exit()) == set(cfg.basic_blocks)
+
+        loop = reachability.bits_of([for_iter, store])
+        assert reachability.forward_bits(for_iter) & loop == loop
+        assert reachability.reaching(0) == [0]
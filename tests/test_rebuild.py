@@ -0,0 +1,141 @@
+import dis
+import unittest
+
+import pycfg
+from pycfg.cfg import USE_EXCEPTION_TABLE
+
+
+before = '''
+def f(x):
+    for i in range(x):
+        try:
+            print(i)
+        finally:
+            print(x)
+    return x
+'''
+
+after_tail = '''
+def f(x):
+    for i in range(x):
+        try:
+            print(i)
+        finally:
+            print(x)
+    if x:
+        return -x
+    return x
+'''
+
+after_head = '''
+def f(x):
+    x += 1
+    for i in range(x):
+        try:
+            print(i)
+        finally:
+            print(x)
+    return x
+'''
+
+after_body = '''
+def f(x):
+    for i in range(x):
+        try:
+            print(i + 1)
+        finally:
+            print(x)
+    return x
+'''
+
+
+def compile_function(source):
+    namespace = {}
+    exec(compile(source, 'f', 'exec'), namespace)
+    return namespace['f'].__code__
+
+
+def describe(cfg):
+    return {
+        offset: (
+            bb.instruction,
+            bb.successors,
+            [(b.creator, b.next_offset) for b in bb.blockstack_view or []],
+            bb.path_metadata,
+        )
+        for offset, bb in cfg.basic_blocks.items()
+    }
+
+
+class TestRebuild(unittest.TestCase):
+    def check(self, old_source, new_source):
+        cfg = pycfg.CFG(compile_function(old_source))
+        new_code = compile_function(new_source)
+
+        kept = {offset: bb for offset, bb in cfg.basic_blocks.items()}
+        changed = cfg.rebuild(new_code)
+
+        assert describe(cfg) == describe(pycfg.CFG(new_code))
+        assert cfg.code is new_code
+        assert len(cfg._blockstack) == len(pycfg.CFG(new_code)._blockstack)
+
+        for offset, bb in cfg.basic_blocks.items():
+            if offset < changed:
+                assert bb is kept[offset]
+
+        return changed
+
+    def line_start(self, source, line):
+        """
+        Returns the offset of the first instruction of `line` of `source`.
+        """
+
+        return min(offset for offset, l in
+                   dis.findlinestarts(compile_function(source)) if l == line)
+
+    def test_edit_at_end(self):
+        changed = self.check(before, after_tail)
+
+        # `if x:` may start with the same instruction as `return x` did
+        assert 0 < changed <= self.line_start(after_tail, 9)
+
+    def test_edit_at_start(self):
+        assert self.check(before, after_head) <= self.line_start(after_head, 3)
+
+    def test_edit_in_loop(self):
+        # the jump back to the loop header crosses the edit
+        changed = self.check(before, after_body)
+
+        assert changed <= self.line_start(after_body, 5)
+
+    @unittest.skipUnless(USE_EXCEPTION_TABLE, "only for exception tables")
+    def test_blocks_after_edit_are_kept(self):
+        old_code = compile_function(before)
+        new_code = compile_function(after_head)
+        cfg = pycfg.CFG(old_code)
+
+        # the node of the last `return x`
+        last = max(cfg.basic_blocks)
+        bb = cfg[last]
+
+        changed = cfg.rebuild(new_code)
+        moved = last + len(new_code.co_code) - len(old_code.co_code)
+
+        assert moved > changed
+        assert cfg[moved] is bb
+
+    def test_no_change(self):
+        code = compile_function(before)
+        cfg = pycfg.CFG(code)
+
+        assert cfg.rebuild(code) == len(code.co_code)
+        assert describe(cfg) == describe(pycfg.CFG(code))
+
+    def test_caches_are_reset(self):
+        cfg = pycfg.CFG(compile_function(before))
+        index = cfg.dense_index()
+
+        cfg.rebuild(compile_function(after_tail))
+
+        assert cfg.dense_index() is not index
+        assert len(cfg.dense_index()) == len(cfg.basic_blocks)
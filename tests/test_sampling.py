@@ -0,0 +1,98 @@
+import dis
+import time
+import unittest
+from collections import Counter
+
+import pycfg
+from pycfg.sampling import SamplingProfiler, _Target, estimate_edge_counts
+
+from .test_cfg import function_registry
+
+
+def busy(seconds):
+    end = time.time() + seconds
+    n = 0
+    while time.time() < end:
+        n += 1
+    return n
+
+
+def f(x):
+    if x:
+        x += 1
+    else:
+        x -= 1
+    return x
+
+
+class TestSamplingProfiler(unittest.TestCase):
+    def test_unreachable_offsets(self):
+        for func in function_registry:
+            cfg = pycfg.CFG(func.__code__)
+            index = cfg.dense_index()
+            target = _Target(cfg)
+
+            for instr in dis.get_instructions(func.__code__):
+                i = index.positions.get(instr.offset, -1)
+                assert target.node_of[instr.offset] == i
+                assert target.node_of[instr.offset + 1] == i
+
+    def check_mode(self, mode):
+        cfg = pycfg.CFG(busy.__code__)
+
+        with SamplingProfiler([cfg], interval=0.001, mode=mode) as profiler:
+            busy(0.2)
+
+        counts = profiler.block_counts(busy.__code__)
+        loop = cfg.loop_forest().roots[0]
+
+        assert profiler.samples > 0
+        assert sum(counts.values()) == profiler.samples
+        assert sum(c for o, c in counts.items() if o in loop) > 0.9 * profiler.samples
+
+        edges = profiler.edge_counts(busy.__code__)
+        assert set(edges) == set(cfg.dense_index().edges())
+
+    def test_thread(self):
+        self.check_mode('thread')
+
+    def test_signal(self):
+        self.check_mode('signal')
+
+
+class TestEstimateEdgeCounts(unittest.TestCase):
+    def run_f(self, cfg, branch_taken):
+        """
+        Returns the nodes visited by a run of `f`, which jumps at its only
+        branch if `branch_taken`.
+        """
+
+        offsets = [0]
+
+        while offsets[-1] != -1:
+            bb = cfg[offsets[-1]]
+            successors = list(dict.fromkeys(bb.successors))
+
+            if len(successors) == 2:
+                jump = bb.instruction.argval
+                fall_through, = [s for s in successors if s != jump]
+                offsets.append(jump if branch_taken else fall_through)
+            else:
+                offsets.append(successors[0])
+
+        return offsets
+
+    def test_flow_conservation(self):
+        cfg = pycfg.CFG(f.__code__)
+
+        # run with a true x 3 times, and a false x once
+        runs = [self.run_f(cfg, False)] * 3 + [self.run_f(cfg, True)]
+        assert runs[0] != runs[-1]
+
+        block_counts = Counter(o for run in runs for o in run)
+        expected = Counter(e for run in runs for e in zip(run, run[1:]))
+
+        edges = estimate_edge_counts(cfg, block_counts)
+
+        assert set(edges) == set(cfg.dense_index().edges())
+        assert {e: c for e, c in edges.items() if c} == expected
@@ -0,0 +1,84 @@
+import dis
+import os
+import tempfile
+import unittest
+
+import pycfg
+from pycfg import serialize
+from pycfg.transform import split_critical_edges
+
+from .test_cfg import function_registry
+
+
+class TestSerialize(unittest.TestCase):
+    def assertSameCFG(self, cfg, mapped):
+        assert len(mapped) == len(cfg.basic_blocks)
+
+        for offset, bb in cfg.basic_blocks.items():
+            node = mapped[offset]
+
+            assert node.offset == offset
+            assert node.opname == bb.instruction.opname
+            assert node.arg == bb.instruction.arg
+            assert node.successors == list(dict.fromkeys(bb.successors))
+            assert node.path_metadata == {k: v for k, v in bb.path_metadata.items()
+                                          if k in ('has return', 'has except',
+                                                   'broken loops') and v}
+
+            view = bb.blockstack_view
+            blocks = [(b.creator, b.next_offset) for b in view] if view else []
+            assert list(node.blocks()) == blocks
+
+        assert [n.offset for n in mapped] == [bb.offset for bb in cfg]
+
+    def test_roundtrip(self):
+        for func in function_registry:
+            cfg = pycfg.CFG(func.__code__)
+            self.assertSameCFG(cfg, serialize.loads(serialize.dumps(cfg)))
+
+    def test_load_mapped_file(self):
+        cfg = pycfg.CFG(function_registry[2].__code__)
+
+        fd, path = tempfile.mkstemp()
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                serialize.dump(cfg, f)
+
+            with serialize.load(path) as mapped:
+                self.assertSameCFG(cfg, mapped)
+
+                assert 1 not in mapped
+                assert list(mapped.dense_index().edges()) == \
+                    list(cfg.dense_index().edges())
+        finally:
+            os.unlink(path)
+
+    def test_synthetic_nodes(self):
+        cfg = pycfg.CFG(function_registry[2].__code__)
+        split_cfg, original_edges = split_critical_edges(cfg)
+
+        assert original_edges
+        mapped = serialize.loads(serialize.dumps(split_cfg))
+
+        assert mapped[-1].opname == 'FUNCTION_EXIT'
+        for offset in original_edges:
+            assert mapped[offset].opname == 'EDGE_SPLIT'
+            assert mapped[offset].opcode == 0
+
+    @unittest.skipUnless('BREAK_LOOP' in dis.opmap, "no BREAK_LOOP in this version")
+    def test_broken_loops(self):
+        cfgs = [pycfg.CFG(func.__code__) for func in function_registry]
+        broken = [bb for cfg in cfgs for bb in cfg
+                  if bb.path_metadata.get('broken loops')]
+
+        # the roundtrip test compares them
+        assert broken
+
+    def test_invalid(self):
+        data = bytearray(serialize.dumps(pycfg.CFG(function_registry[0].__code__)))
+
+        with self.assertRaises(serialize.InvalidCFGFile):
+            serialize.loads(b'nope' + bytes(data[4:]))
+
+        with self.assertRaises(serialize.InvalidCFGFile):
+            serialize.loads(bytes(data[:-8]))
@@ -0,0 +1,156 @@
+import os
+import socket
+import tempfile
+import threading
+import unittest
+
+import pycfg
+from pycfg import serialize
+from pycfg.cfg import USE_EXCEPTION_TABLE
+from pycfg.server import CFGServer, Client, ServerError, default_socket_path
+
+from .test_cfg import function_registry
+
+
+def unsupported():
+    """
+    Returns a code object whose CFG can't be built.
+    """
+
+    if not USE_EXCEPTION_TABLE:
+        async def f():
+            async with x:   # noqa
+                pass
+        return f.__code__
+
+    # a handler at code unit 200, far past the end of the code
+    code = function_registry[0].__code__
+    return code.replace(co_exceptiontable=bytes([0x80, 0x01, 0x43, 0x08, 0x00]))
+
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'pycfg.sock')
+
+        self.server = CFGServer(self.path, cache_size=4)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        os.rmdir(self.directory)
+
+    def test_batch(self):
+        codes = [f.__code__ for f in function_registry[:3]]
+
+        with Client(self.path) as client:
+            cfgs = client.get_many(codes)
+            client.get(codes[0])
+
+        for code, cfg in zip(codes, cfgs):
+            assert isinstance(cfg, serialize.MappedCFG)
+            expected = pycfg.CFG(code)
+            assert [bb.offset for bb in cfg] == [bb.offset for bb in expected]
+
+        assert self.server.cache.misses == 3
+        assert self.server.cache.hits == 1
+
+    def test_lru(self):
+        codes = [f.__code__ for f in function_registry[:6]]
+
+        with Client(self.path) as client:
+            client.get_many(codes)
+
+        assert len(self.server.cache) == 4
+
+    def test_errors_are_raised_in_process(self):
+        with Client(self.path) as client:
+            with self.assertRaises(ValueError):
+                client.get(unsupported())
+
+    def test_already_running(self):
+        with self.assertRaises(ServerError):
+            CFGServer(self.path)
+
+        # the running server keeps its socket
+        with Client(self.path) as client:
+            client.request([function_registry[0].__code__])
+
+
+class TestSocketPath(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'pycfg.sock')
+
+    def tearDown(self):
+        if os.path.lexists(self.path):
+            os.unlink(self.path)
+        os.rmdir(self.directory)
+
+    def test_stale_socket(self):
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(self.path)
+        stale.close()
+
+        server = CFGServer(self.path)
+        server.server_close()
+
+        assert not os.path.exists(self.path)
+
+    def test_other_file(self):
+        with open(self.path, 'w') as f:
+            f.write('keep me')
+
+        with self.assertRaises(ServerError):
+            CFGServer(self.path)
+
+        with open(self.path) as f:
+            assert f.read() == 'keep me'
+
+    def test_default_path(self):
+        old = os.environ.get('XDG_RUNTIME_DIR')
+        os.environ['XDG_RUNTIME_DIR'] = self.directory
+
+        try:
+            assert default_socket_path() == self.path
+        finally:
+            if old is None:
+                del os.environ['XDG_RUNTIME_DIR']
+            else:
+                os.environ['XDG_RUNTIME_DIR'] = old
+
+    def test_private_directory(self):
+        old_environ = os.environ.pop('XDG_RUNTIME_DIR', None)
+        old_tempdir = tempfile.tempdir
+        tempfile.tempdir = self.directory
+        private = os.path.join(self.directory, 'pycfg-%d' % os.getuid())
+
+        try:
+            path = default_socket_path(create=True)
+
+            assert os.path.dirname(path) == private
+            assert os.stat(private).st_mode & 0o777 == 0o700
+
+            os.chmod(private, 0o755)
+            with self.assertRaises(ServerError):
+                default_socket_path()
+        finally:
+            tempfile.tempdir = old_tempdir
+            if old_environ is not None:
+                os.environ['XDG_RUNTIME_DIR'] = old_environ
+            if os.path.exists(private):
+                os.rmdir(private)
+
+
+class TestFallback(unittest.TestCase):
+    def test_no_server(self):
+        client = Client(os.path.join(tempfile.gettempdir(), 'no-such-pycfg.sock'))
+        code = function_registry[0].__code__
+        cfg = client.get(code)
+
+        # the same type as the CFGs from a server
+        assert isinstance(cfg, serialize.MappedCFG)
+        assert [bb.offset for bb in cfg] == [bb.offset for bb in pycfg.CFG(code)]
@@ -0,0 +1,70 @@
+import unittest
+
+import pycfg
+from pycfg.transform import critical_edges, split_critical_edges
+
+
+def f(x):
+    for i in range(x):
+        print(i)
+        if i > 3:
+            break
+    return 1
+
+
+class TestSplitCriticalEdges(unittest.TestCase):
+    def setUp(self):
+        self.cfg = pycfg.CFG(f.__code__)
+
+    def test_critical_edges(self):
+        edges = set(self.cfg.dense_index().edges())
+        expected = {(start, end) for start, end in edges
+                    if self.cfg.is_critical((start, end)) and
+                    len(set(self.cfg[start].successors)) > 1}
+
+        assert set(critical_edges(self.cfg)) == expected
+
+        predecessors = {offset: [] for offset in self.cfg.basic_blocks}
+        for start, end in edges:
+            predecessors[end].append(start)
+
+        for start, end in edges:
+            assert self.cfg.is_critical((start, end)) == \
+                (len(predecessors[end]) > 1)
+
+        # the edge entering the loop can be instrumented at the end of its
+        # source, even though the loop header has several predecessors
+        header = next(bb.offset for bb in self.cfg
+                      if bb.instruction.opname == 'FOR_ITER')
+        entry = next(bb.offset for bb in self.cfg
+                     if bb.instruction.opname == 'GET_ITER')
+
+        assert len(predecessors[header]) > 1
+        assert (entry, header) in edges
+        assert self.cfg.is_critical((entry, header))
+        assert (entry, header) not in critical_edges(self.cfg)
+
+    def test_split(self):
+        original = {offset: list(bb.successors)
+                    for offset, bb in self.cfg.basic_blocks.items()}
+
+        split_cfg, original_edges = split_critical_edges(self.cfg)
+
+        # the original CFG is untouched
+        assert {offset: bb.successors
+                for offset, bb in self.cfg.basic_blocks.items()} == original
+
+        assert set(original_edges.values()) == set(critical_edges(self.cfg))
+        assert not critical_edges(split_cfg) or all(
+            split_cfg[start].instruction.opname == 'EDGE_SPLIT'
+            for start, _ in critical_edges(split_cfg))
+
+        for offset, (start, end) in original_edges.items():
+            assert offset < -1
+            assert split_cfg[offset].successors == [end]
+            assert offset in split_cfg[start].successors
+            assert end not in split_cfg[start].successors
+
+        for bb in split_cfg:
+            for succ in bb.successors:
+                assert succ in split_cfg
@@ -79,3 +79,30 @@ def try_path(path, cfg):
             raise MissingSuccessorException(error_msg)
 
     return True
+
+
+def offsets_of(func, *opnames):
+    """
+    Returns the offsets of the instructions of `func` whose opname is one of
+    `opnames`, in order, so that tests don't depend on the bytecode of one
+    version of Python.
+    """
+
+    return [instr.offset for instr in dis.get_instructions(func)
+            if instr.opname in opnames]
+
+
+def last_offset(func):
+    return list(dis.get_instructions(func))[-1].offset
+
+
+def line_start(func, line):
+    """
+    Returns the offset of the first instruction of the `line`-th line of
+    `func`, counting the `def` line as line 0.
+    """
+
+    line += func.__code__.co_firstlineno
+
+    return min(offset for offset, l in dis.findlinestarts(func.__code__)
+               if l == line)